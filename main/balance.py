@@ -0,0 +1,218 @@
+# Monte Carlo balance sweeps. Runs many independent fights per (player
+# level, enemy, weather, equipment) cell as NumPy array operations, one
+# turn of every fight at a time, following the rules in combat.py.
+#
+#   python balance.py [fights per cell] [--unscaled] [--all-equipment] [--csv FILE]
+import csv
+import os
+import sys
+import time
+from itertools import repeat
+
+import numpy as np
+
+# The game module opens a window and an audio device on import
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import combat
+import playing
+from rng import RandomStreams
+
+LEVELS = range(1, 31)
+MAX_TURNS = 1000
+
+# Weapon and armor worn in each equipment loadout
+LOADOUTS = {
+    "starter": ("Wooden Sword", "Leather Vest"),
+    "iron": ("Iron Sword", "Chainmail"),
+    "steel": ("Steel Sword", "Plate Armor"),
+    "silver": ("Silver Sword", "Silver Armor"),
+    "dragon": ("Dragonbone Sword", "Dragon Scale Armor"),
+}
+
+# Policy: attack, but drink a potion when HP drops below this fraction
+POTION_THRESHOLD = 0.3
+
+# Player max HP, attack and defense per level and loadout, grown through
+# Player.level_up and equip_item so the numbers follow the game
+def player_stats(levels, loadout):
+    player = playing.Player("Sim")
+    player.unequip_item(player.equipped_weapon)
+    player.unequip_item(player.equipped_armor)
+    weapon, armor = (playing.item_catalog.named(name) for name in LOADOUTS[loadout])
+    player.equip_item(weapon)
+    player.equip_item(armor)
+    
+    stats = {}
+    for level in range(1, max(levels) + 1):
+        if level > 1:
+            player.level_up()
+        stats[level] = (player.max_hp, player.attack, player.defense)
+    return stats
+
+# Run `fights` fights for every cell. Returns one row per cell with the
+# win rate and the mean turns, HP lost and potions used per fight
+def sweep(levels=LEVELS, weathers=tuple(playing.Weather), loadouts=("starter",), fights=1000,
+          potions=3, potion_heal=20, scaled=True, seed=0):
+    rng = RandomStreams(seed)
+    enemies = playing.create_enemies()
+    cells = [(level, enemy, weather, loadout)
+             for loadout in loadouts
+             for level in levels
+             for enemy in enemies
+             for weather in weathers]
+    stats = {loadout: player_stats(levels, loadout) for loadout in loadouts}
+    
+    # Per-cell parameters, repeated for each fight in the cell
+    def column(values):
+        return np.repeat(np.array(values, dtype=np.float64), fights)
+    
+    max_hp = column([stats[loadout][level][0] for level, enemy, weather, loadout in cells])
+    attack = column([stats[loadout][level][1] for level, enemy, weather, loadout in cells])
+    defense = column([stats[loadout][level][2] for level, enemy, weather, loadout in cells])
+    weather = np.repeat(np.array([weather.value for level, enemy, weather, loadout in cells]), fights)
+    lanes = len(max_hp)
+    
+    # Enemy stats, scaled to the player level as in the explore screen
+    if scaled:
+        level = np.repeat(np.array([level for level, enemy, weather, loadout in cells]), fights)
+        enemy_level = np.maximum(1, level + rng.integers("world", -1, 3, lanes))
+        enemy_hp = 30.0 * enemy_level
+        enemy_attack = 8.0 * enemy_level
+        enemy_defense = 2 * enemy_level
+    else:
+        enemy_hp = column([enemy.hp for level, enemy, weather, loadout in cells])
+        enemy_attack = column([enemy.attack for level, enemy, weather, loadout in cells])
+        enemy_defense = np.repeat(np.array([enemy.defense for level, enemy, weather, loadout in cells]), fights)
+    
+    # Weather modifiers per lane, gathered from the shared tables
+    enemy_attack_multiplier = np.array(combat.ENEMY_ATTACK_MULTIPLIERS)[weather]
+    enemy_defense_multiplier = np.array(combat.ENEMY_DEFENSE_MULTIPLIERS)[weather]
+    player_damage_multiplier = np.array(combat.PLAYER_DAMAGE_MULTIPLIERS)[weather]
+    
+    # Damage per hit is fixed for a fight, so resolve it once per lane
+    player_damage = np.maximum(1, attack - enemy_defense // 2)
+    player_damage = np.maximum(1, player_damage - enemy_defense * enemy_defense_multiplier)
+    enemy_damage = np.maximum(1, enemy_attack * enemy_attack_multiplier - defense // 2)
+    enemy_damage = np.maximum(1, (enemy_damage - defense) * player_damage_multiplier)
+    
+    hp = max_hp.copy()
+    potions_left = np.full(lanes, potions)
+    turns = np.zeros(lanes, dtype=np.int32)
+    hp_lost = np.zeros(lanes)
+    won = np.zeros(lanes, dtype=bool)
+    done = np.zeros(lanes, dtype=bool)
+    
+    for _ in range(MAX_TURNS):
+        active = ~done
+        if not active.any():
+            break
+        
+        drink = active & (potions_left > 0) & (hp < POTION_THRESHOLD * max_hp)
+        strike = active & ~drink
+        
+        # Player turn
+        enemy_hp -= strike * player_damage
+        victory = strike & (enemy_hp <= 0)
+        hp = np.where(drink, np.minimum(max_hp, hp + potion_heal), hp)
+        potions_left -= drink
+        
+        # Enemy turn
+        hit = active & ~victory
+        hp -= hit * enemy_damage
+        hp_lost += hit * enemy_damage
+        
+        turns += active
+        won |= victory
+        done |= victory | (hit & (hp <= 0))
+    
+    potions_used = potions - potions_left
+    
+    def per_cell(values):
+        return values.reshape(len(cells), fights).mean(axis=1)
+    
+    win_rate = per_cell(won.astype(np.float64))
+    mean_turns = per_cell(turns.astype(np.float64))
+    mean_hp_lost = per_cell(hp_lost)
+    mean_potions = per_cell(potions_used.astype(np.float64))
+    
+    return [
+        {
+            "level": level,
+            "enemy": enemy.name,
+            "weather": weather.name.lower(),
+            "equipment": loadout,
+            "win_rate": float(win_rate[i]),
+            "turns": float(mean_turns[i]),
+            "hp_lost": float(mean_hp_lost[i]),
+            "potions_used": float(mean_potions[i]),
+        }
+        for i, (level, enemy, weather, loadout) in enumerate(cells)
+    ]
+
+# The same policy fought one fight at a time through combat.CombatEngine,
+# for checking the vectorized sweep and timing the per-fight loop
+def engine_win_rate(level, enemy, weather, loadout="starter", fights=1000, potions=3,
+                    potion_heal=20, scaled=True, seed=0):
+    rng = RandomStreams(seed)
+    max_hp, attack, defense = player_stats([level], loadout)[level]
+    wins = 0
+    for _ in range(fights):
+        if scaled:
+            enemy_level = max(1, level + rng.world.randint(-1, 2))
+            foe = combat.Fighter(30 * enemy_level, 8 * enemy_level, 2 * enemy_level)
+        else:
+            foe = combat.Fighter(enemy.hp, enemy.attack, enemy.defense)
+        player = combat.Fighter(max_hp, attack, defense)
+        engine = combat.CombatEngine(player, foe, weather.value, potions=repeat(potion_heal, potions), rng=rng.combat)
+        
+        def policy():
+            while True:
+                low = player.hp < POTION_THRESHOLD * player.max_hp
+                yield combat.ITEM if low and engine.potions else combat.ATTACK
+        
+        if engine.run(policy(), MAX_TURNS) == "victory":
+            wins += 1
+    return wins / fights
+
+def main():
+    args = sys.argv[1:]
+    fights = int(args[0]) if args and args[0].isdigit() else 1000
+    scaled = "--unscaled" not in args
+    loadouts = tuple(LOADOUTS) if "--all-equipment" in args else ("starter",)
+    
+    start = time.perf_counter()
+    rows = sweep(loadouts=loadouts, fights=fights, scaled=scaled)
+    elapsed = time.perf_counter() - start
+    print(f"{len(rows)} cells x {fights} fights in {elapsed:.2f}s")
+    
+    # Time the same fights one at a time for comparison, on a sample cell
+    enemies = playing.create_enemies()
+    sample = 2000
+    start = time.perf_counter()
+    reference = engine_win_rate(3, enemies[0], playing.Weather.CLEAR, fights=sample, scaled=scaled)
+    per_fight = (time.perf_counter() - start) / sample
+    row = next(r for r in rows if r["level"] == 3 and r["enemy"] == enemies[0].name and r["weather"] == "clear")
+    print(f"Per-fight engine loop: ~{per_fight * len(rows) * fights:.0f}s for the same sweep "
+          f"(level 3 {enemies[0].name}: engine {reference:.1%}, sweep {row['win_rate']:.1%})")
+    
+    if "--csv" in args:
+        path = args[args.index("--csv") + 1]
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Wrote {path}")
+    
+    # Summary: win rate per level and equipment, averaged over enemies and weather
+    print("level  " + "  ".join(f"{loadout:>8}" for loadout in loadouts))
+    for level in LEVELS:
+        rates = []
+        for loadout in loadouts:
+            cell_rows = [r for r in rows if r["level"] == level and r["equipment"] == loadout]
+            rates.append(sum(r["win_rate"] for r in cell_rows) / len(cell_rows))
+        print(f"{level:>5}  " + "  ".join(f"{rate:>8.1%}" for rate in rates))
+
+if __name__ == "__main__":
+    main()
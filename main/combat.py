@@ -0,0 +1,158 @@
+# Turn-based combat rules, kept free of pygame so fights can be resolved
+# headless (balance analysis, simulations, replays). The game's combat
+# screen is a renderer over CombatEngine.
+import random
+import sys
+import time
+from itertools import repeat
+
+# Player actions
+ATTACK = "attack"
+DEFEND = "defend"
+ITEM = "item"
+FLEE = "flee"
+
+# Combat states
+PLAYER_TURN = 0
+ENEMY_TURN = 1
+VICTORY = 2
+DEFEAT = 3
+FLED = 4
+
+RESULTS = {VICTORY: "victory", DEFEAT: "defeat", FLED: "flee"}
+
+# Log events. Each log entry is a (turn, event, value) tuple
+HIT = "hit"                      # value: damage dealt by the player
+BRACE = "brace"                  # value: None
+HEAL = "heal"                    # value: HP restored by the potion
+NO_POTIONS = "no_potions"        # value: None
+FLEE_FAILED = "flee_failed"      # value: None
+ESCAPED = "escaped"              # value: None
+ENEMY_HIT = "enemy_hit"          # value: damage dealt by the enemy
+ENEMY_DEFEATED = "enemy_defeated"
+PLAYER_DEFEATED = "player_defeated"
+
+FLEE_CHANCE = 0.7
+
+# Weather effects indexed by Weather value (CLEAR, RAIN, SNOW, SANDSTORM).
+# This is the one table of weather modifiers: the game, CombatEngine and
+# the simulators all index it, so a fight resolves without any branching
+# on the weather. Vectorized simulators turn each tuple into an array and
+# index it with a whole array of weather values at once
+ENEMY_ATTACK_MULTIPLIERS = (1.0, 0.9, 1.0, 1.1)
+ENEMY_DEFENSE_MULTIPLIERS = (1.0, 1.0, 1.1, 0.9)
+PLAYER_DAMAGE_MULTIPLIERS = (1.0, 0.9, 1.0, 1.2)  # Rain eases, sandstorm hurts
+
+# Resolves one fight. `player` and `enemy` can be any objects with hp,
+# max_hp, attack and defense; their hp is updated in place. `weather` is
+# a Weather value and `potions` lists the heal amounts of the player's
+# potions, used first to last. Every roll comes from `rng`, so a seed and
+# an action stream replay the same fight
+class CombatEngine:
+    def __init__(self, player, enemy, weather=0, potions=(), seed=None, rng=None):
+        self.player = player
+        self.enemy = enemy
+        self.potions = list(potions)
+        self.rng = rng or random.Random(seed)
+        self.state = PLAYER_TURN
+        self.turn = 0
+        self.log = []
+        
+        self.enemy_attack_power = enemy.attack * ENEMY_ATTACK_MULTIPLIERS[weather]
+        self.enemy_defense = enemy.defense * ENEMY_DEFENSE_MULTIPLIERS[weather]
+        self.player_damage_multiplier = PLAYER_DAMAGE_MULTIPLIERS[weather]
+    
+    @property
+    def result(self):
+        return RESULTS.get(self.state)
+    
+    def act(self, action):
+        # Resolve the player's action and, if the fight goes on, the enemy's reply
+        if self.state != PLAYER_TURN:
+            return self.state
+        
+        player = self.player
+        enemy = self.enemy
+        log = self.log
+        self.turn += 1
+        turn = self.turn
+        
+        if action == ATTACK:
+            damage = max(1, player.attack - enemy.defense // 2)
+            enemy.hp -= max(1, damage - self.enemy_defense)
+            log.append((turn, HIT, damage))
+            
+            if enemy.hp <= 0:
+                log.append((turn, ENEMY_DEFEATED, None))
+                self.state = VICTORY
+                return VICTORY
+        
+        elif action == DEFEND:
+            # TODO: Implement defend mechanic
+            log.append((turn, BRACE, None))
+        
+        elif action == ITEM:
+            if self.potions:
+                amount = self.potions.pop(0)
+                player.hp = min(player.max_hp, player.hp + amount)
+                log.append((turn, HEAL, amount))
+            else:
+                log.append((turn, NO_POTIONS, None))
+        
+        elif action == FLEE:
+            if self.rng.random() < FLEE_CHANCE:
+                log.append((turn, ESCAPED, None))
+                self.state = FLED
+                return FLED
+            log.append((turn, FLEE_FAILED, None))
+        
+        else:
+            raise ValueError(f"Unknown combat action: {action!r}")
+        
+        # Enemy turn
+        damage = max(1, self.enemy_attack_power - player.defense // 2)
+        player.hp -= max(1, (damage - player.defense) * self.player_damage_multiplier)
+        log.append((turn, ENEMY_HIT, damage))
+        
+        if player.hp <= 0:
+            log.append((turn, PLAYER_DEFEATED, None))
+            self.state = DEFEAT
+        return self.state
+    
+    def run(self, actions, max_turns=1000):
+        # Play actions until the fight is decided, the stream runs out or
+        # max_turns is reached. Returns the result, or None if undecided
+        act = self.act
+        for action in actions:
+            if act(action) != PLAYER_TURN or self.turn >= max_turns:
+                break
+        return self.result
+
+# Plain combatant for headless fights
+class Fighter:
+    __slots__ = ("hp", "max_hp", "attack", "defense")
+    
+    def __init__(self, hp, attack, defense, max_hp=None):
+        self.hp = hp
+        self.max_hp = max_hp or hp
+        self.attack = attack
+        self.defense = defense
+
+# Throughput check: python combat.py [fights]
+def benchmark(fights=200000, seed=1):
+    rng = random.Random(seed)
+    wins = 0
+    start = time.perf_counter()
+    for _ in range(fights):
+        level = rng.randint(1, 5)
+        player = Fighter(100 + 20 * (level - 1), 12 + 2 * (level - 1), 8 + (level - 1))
+        enemy = Fighter(30 * level, 8 * level, 2 * level)
+        engine = CombatEngine(player, enemy, rng.randrange(4), potions=(20,), rng=rng)
+        if engine.run(repeat(ATTACK)) == "victory":
+            wins += 1
+    elapsed = time.perf_counter() - start
+    print(f"{fights} fights in {elapsed:.2f}s ({fights / elapsed * 60:,.0f} fights/minute), "
+          f"win rate {wins / fights:.1%}")
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
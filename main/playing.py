@@ -4,8 +4,16 @@ import os
 import sys
 import json
 import time
+import threading
+import mmap
+import struct
 from pygame import mixer
+from collections import OrderedDict, namedtuple
+from array import array
 from enum import Enum
+import combat
+import savefile
+from rng import RandomStreams
 
 # Initialize pygame
 pygame.init()
@@ -30,9 +38,6 @@ ORANGE = (255, 165, 0)
 GRAY = (100, 100, 100)
 SILVER = (210, 180, 140)
 
-town_screen = pygame.image.load("assets/images/town_bg.png")
-explore_screen = pygame.image.load("assets/images/explore.png")
-
 # Weather colors
 RAIN_COLOR = (100, 100, 150, 100)
 SNOW_COLOR = (200, 200, 255, 150)
@@ -43,12 +48,44 @@ screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 pygame.display.set_caption(TITLE)
 clock = pygame.time.Clock()
 
+# Gameplay randomness (combat, loot, weather, world). Purely visual
+# effects keep using the random module
+game_rng = RandomStreams()
+
 # Fonts
 font_small = pygame.font.SysFont('Arial', 18)
 font_medium = pygame.font.SysFont('Arial', 24)
 font_large = pygame.font.SysFont('Arial', 36)
 font_title = pygame.font.SysFont('Arial', 48)
 
+TEXT_CACHE_SIZE = 512
+
+# Rendered text surfaces keyed by (font, text, antialias, color), most
+# recently used last, so unchanged labels are only rendered once
+class TextCache:
+    def __init__(self, size=TEXT_CACHE_SIZE):
+        self.size = size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def render(self, font, text, antialias, color):
+        key = (font, text, antialias, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+text_cache = TextCache()
+
 # Weather types
 class Weather(Enum):
     CLEAR = 0
@@ -63,6 +100,16 @@ class TimeOfDay(Enum):
     DUSK = 2
     NIGHT = 3
 
+# Save files. Each game saves to its own slot file in SAVE_DIR
+SAVE_DIR = "saves"
+SAVE_SLOTS_PER_PAGE = 6
+SAVE_PATH = "savegame.sav"          # Single save written by older versions
+LEGACY_SAVE_PATH = "savegame.json"  # JSON save written by older versions
+JOURNAL_COMPACT_RECORDS = 500  # Journal records before the next save is a full one
+
+# Autosaves are written on this worker's thread
+save_worker = savefile.SaveWorker()
+
 # Game state class
 class GameState:
     MAIN_MENU = 0
@@ -79,17 +126,32 @@ class GameState:
     MINIGAME = 11
     DIALOGUE = 12
     MAP = 13
+    SAVE_SLOTS = 14
+    LOADING = 15
+
+def decode_image(name, scale=1):
+    image = pygame.image.load(f"assets/images/{name}.png")
+    if scale != 1:
+        new_size = (int(image.get_width() * scale), int(image.get_height() * scale))
+        image = pygame.transform.scale(image, new_size)
+    return image
+
+def decode_background(name):
+    image = pygame.image.load(f"assets/images/{name}.png")
+    if image.get_size() != (SCREEN_WIDTH, SCREEN_HEIGHT):
+        image = pygame.transform.smoothscale(image, (SCREEN_WIDTH, SCREEN_HEIGHT))
+    return image
 
 def load_image(name, scale=1):
     try:
         # Remove .png if it was accidentally included in the name
         if name.endswith('.png'):
             name = name[:-4]
-        image = pygame.image.load(f"assets/images/{name}.png").convert_alpha()
-        if scale != 1:
-            new_size = (int(image.get_width() * scale), int(image.get_height() * scale))
-            image = pygame.transform.scale(image, new_size)
-        return image
+        if asset_pack:
+            image = asset_pack.load(f"{name}@{scale}", name)
+            if image:
+                return image.convert_alpha()
+        return decode_image(name, scale).convert_alpha()
     except FileNotFoundError:
         # Create a placeholder surface if image not found
         print(f"Image not found: assets/images/{name}.png - creating placeholder")
@@ -97,10 +159,117 @@ def load_image(name, scale=1):
         color = (random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
         pygame.draw.rect(surf, color, (0, 0, 50, 50))
         pygame.draw.rect(surf, BLACK, (0, 0, 50, 50), 2)
-        text = font_small.render(name[:3], True, BLACK)
+        text = text_cache.render(font_small, name[:3], True, BLACK)
         surf.blit(text, (25 - text.get_width()//2, 25 - text.get_height()//2))
         return surf
 
+# Full-screen backgrounds, keyed by file name. They are opaque, so they are
+# stored pre-scaled to the window in display format and blit on the fast path
+background_cache = {}
+
+def load_background(name):
+    if name.endswith('.png'):
+        name = name[:-4]
+    if name in background_cache:
+        return background_cache[name]
+    try:
+        image = None
+        if asset_pack:
+            image = asset_pack.load(f"{name}@{SCREEN_WIDTH}x{SCREEN_HEIGHT}", name)
+        if not image:
+            image = decode_background(name)
+        image = image.convert()
+    except FileNotFoundError:
+        print(f"Image not found: assets/images/{name}.png - creating placeholder")
+        image = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        image.fill(GRAY)
+    background_cache[name] = image
+    return image
+
+# Packed asset file: pixel buffers already decoded and scaled to their final
+# size, built with `python playing.py --build-asset-pack`.
+# Layout: magic, index length (uint32), JSON index, raw pixel data
+ASSET_PACK_PATH = "assets/assets.pack"
+ASSET_PACK_MAGIC = b"ADVPACK1"
+
+class AssetPack:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header_end = len(ASSET_PACK_MAGIC) + 4
+        if self.data[:len(ASSET_PACK_MAGIC)] != ASSET_PACK_MAGIC:
+            raise ValueError(f"{path} is not an asset pack")
+        (index_size,) = struct.unpack("<I", self.data[len(ASSET_PACK_MAGIC):header_end])
+        self.entries = json.loads(self.data[header_end:header_end + index_size])
+        self.data_start = header_end + index_size
+    
+    def load(self, key, name):
+        entry = self.entries.get(key)
+        if not entry:
+            return None
+        
+        # The entry is stale if its source image changed after the pack was built
+        try:
+            stat = os.stat(f"assets/images/{name}.png")
+        except FileNotFoundError:
+            return None
+        if stat.st_size != entry["source_size"] or stat.st_mtime_ns != entry["source_mtime"]:
+            return None
+        
+        start = self.data_start + entry["offset"]
+        pixels = memoryview(self.data)[start:start + entry["length"]]
+        return pygame.image.frombuffer(pixels, (entry["width"], entry["height"]), entry["format"])
+
+def open_asset_pack(path=ASSET_PACK_PATH):
+    try:
+        return AssetPack(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Asset pack {path} unreadable ({e}) - loading images directly")
+        return None
+
+def build_asset_pack(path=ASSET_PACK_PATH):
+    sources = {}
+    for file_name in BACKGROUND_ASSETS.values():
+        name = file_name[:-4]
+        sources[f"{name}@{SCREEN_WIDTH}x{SCREEN_HEIGHT}"] = (name, decode_background, (), "RGB")
+    for file_name, scale in IMAGE_ASSETS.values():
+        name = file_name[:-4]
+        sources[f"{name}@{scale}"] = (name, decode_image, (scale,), "RGBA")
+    
+    entries = {}
+    chunks = []
+    offset = 0
+    for key, (name, decode, args, pixel_format) in sources.items():
+        image = decode(name, *args)
+        pixels = pygame.image.tostring(image, pixel_format)
+        stat = os.stat(f"assets/images/{name}.png")
+        entries[key] = {
+            "width": image.get_width(),
+            "height": image.get_height(),
+            "format": pixel_format,
+            "offset": offset,
+            "length": len(pixels),
+            "source_size": stat.st_size,
+            "source_mtime": stat.st_mtime_ns
+        }
+        chunks.append(pixels)
+        offset += len(pixels)
+    
+    # Write to a temporary file first so a running game never maps a half-written pack
+    index = json.dumps(entries).encode()
+    with open(path + ".tmp", 'wb') as f:
+        f.write(ASSET_PACK_MAGIC)
+        f.write(struct.pack("<I", len(index)))
+        f.write(index)
+        for pixels in chunks:
+            f.write(pixels)
+    os.replace(path + ".tmp", path)
+    print(f"Packed {len(entries)} images into {path} ({offset // 1024} KB)")
+
+asset_pack = open_asset_pack()
+
 def load_sound(name):
     try:
         if name.endswith('.mp3'):
@@ -111,73 +280,200 @@ def load_sound(name):
         # Return a silent sound
         return mixer.Sound(buffer=bytearray(44))
 
-# Game assets
+# Upper bound on decoded sound data kept in memory, in bytes
+AUDIO_BUDGET = 24 * 1024 * 1024
+
+# Ambient loops played on channel 1 for each weather type
+AMBIENT_SOUNDS = {
+    Weather.RAIN: "rain.mp3",
+    Weather.SNOW: "snow.mp3",
+    Weather.SANDSTORM: "wind.mp3",
+}
+
+def sound_size(sound):
+    frequency, bits, channels = mixer.get_init()
+    return int(sound.get_length() * frequency) * channels * (abs(bits) // 8)
+
+# Keeps decoded sounds within a memory budget. Short effects stay resident
+# and are evicted least-recently-used first; ambient loops are only decoded
+# while their weather is active and are dropped as soon as it changes.
+# (mixer.music is the only streamed source and it carries the background
+# music, so ambient loops cannot be streamed alongside it.)
+class AudioManager:
+    def __init__(self, budget=AUDIO_BUDGET):
+        self.budget = budget
+        self.sounds = OrderedDict()  # file name -> (Sound, size), oldest use first
+        self.resident_bytes = 0
+        self.ambient_weather = Weather.CLEAR
+        self.ambient_name = None
+        self.lock = threading.Lock()
+    
+    def get(self, name):
+        with self.lock:
+            if name in self.sounds:
+                self.sounds.move_to_end(name)
+                return self.sounds[name][0]
+            
+            sound = load_sound(name)
+            size = sound_size(sound)
+            self.sounds[name] = (sound, size)
+            self.resident_bytes += size
+            self.trim()
+            return sound
+    
+    def trim(self):
+        for name in list(self.sounds):
+            if self.resident_bytes <= self.budget:
+                break
+            # Never drop the loop that is currently playing
+            if name == self.ambient_name:
+                continue
+            self.evict(name)
+    
+    def evict(self, name):
+        if name in self.sounds:
+            sound, size = self.sounds.pop(name)
+            self.resident_bytes -= size
+    
+    def set_ambient(self, weather):
+        channel = mixer.Channel(1)
+        if weather == self.ambient_weather:
+            if self.ambient_name and not channel.get_busy():
+                channel.play(self.get(self.ambient_name), loops=-1)
+            return
+        
+        # Weather changed: stop and release the old loop before decoding the new one
+        channel.stop()
+        if self.ambient_name:
+            with self.lock:
+                self.evict(self.ambient_name)
+        self.ambient_weather = weather
+        self.ambient_name = AMBIENT_SOUNDS.get(weather)
+        if self.ambient_name:
+            channel.play(self.get(self.ambient_name), loops=-1)
+
+# Full-screen backgrounds: attribute name -> file name
+BACKGROUND_ASSETS = {
+    "main_menu_bg": "main_menu_bg.png",
+    "forest_bg": "forest_bg.png",
+    "town_bg": "town_bg.png",
+    "cave_bg": "cave_bg.png",
+    "castle_bg": "castle_bg.png",
+    "desert_bg": "desert_bg.png",
+    "swamp_bg": "swamp_bg.png",
+    "beach_bg": "beach_bg.png",
+    "mountain_bg": "mountain_bg.png",
+    "map_bg": "world_map.png",
+    "explore_screen": "explore.png",
+}
+
+# Sprites and icons: attribute name -> (file name, scale)
+IMAGE_ASSETS = {
+    # Character sprites
+    "player_img": ("Player.png", 0.5),
+    "goblin_img": ("goblin.png", 0.5),
+    "wolf_img": ("wolf.png", 0.5),
+    "bandit_img": ("bandit.png", 0.5),
+    "orc_img": ("orc.png", 0.5),
+    "dragon_img": ("dragon.png", 0.5),
+    "skeleton_img": ("skeleton.png", 0.5),
+    "spider_img": ("spider.png", 0.5),
+    "merchant_img": ("merchant.png", 0.5),
+    "blacksmith_img": ("blacksmith.png", 0.5),
+    "quest_giver_img": ("quest_giver.png", 0.5),
+    
+    # Item icons
+    "sword_icon": ("sword_icon.png", 0.5),
+    "armor_icon": ("armor_icon.png", 0.5),
+    "potion_icon": ("potion_icon.png", 0.5),
+    "misc_icon": ("misc_icon.png", 0.5),
+    "gold_icon": ("gold_icon.png", 0.5),
+    "herb_icon": ("herb_icon.png", 0.5),
+    "ore_icon": ("ore_icon.png", 0.5),
+    "scroll_icon": ("scroll_icon.png", 0.5),
+    "key_icon": ("key_icon.png", 0.5),
+    
+    # UI elements
+    "button_img": ("button.png", 0.5),
+    "button_hover_img": ("button.png", 0.5),
+    "quest_icon": ("quest_icon.png", 0.5),
+    "skill_icon": ("skill_icon.png", 0.5),
+    "crafting_icon": ("crafting_icon.png", 0.5),
+    
+    # Weather effects
+    "rain_img": ("rain.png", 0.5),
+    "snow_img": ("snow.png", 0.5),
+}
+
+# Sound effects: attribute name -> file name
+SOUND_ASSETS = {
+    "attack_sound": "attack.mp3",
+    "heal_sound": "heal.mp3",
+    "level_up_sound": "level_up.mp3",
+    "victory_sound": "victory.mp3",
+    "defeat_sound": "defeat.mp3",
+    "crafting_sound": "crafting.mp3",
+    "quest_complete_sound": "quest_complete.mp3",
+}
+
+# Assets each screen needs for its first frame
+SCREEN_ASSETS = {
+    "main_menu": ["main_menu_bg"],
+    "town": ["town_bg", "blacksmith_img", "merchant_img", "quest_giver_img"],
+    "explore": ["forest_bg", "cave_bg", "mountain_bg", "explore_screen"],
+    "combat": ["player_img", "goblin_img", "wolf_img", "bandit_img", "orc_img",
+               "skeleton_img", "spider_img", "dragon_img", "attack_sound"],
+    "map": ["map_bg"],
+}
+
+# Game assets, loaded on first access
 class Assets:
     def __init__(self):
-        # Backgrounds
-        self.main_menu_bg = load_image("main_menu_bg.png")
-        self.forest_bg = load_image("forest_bg.png")
-        self.town_bg = load_image("town_bg.png")
-        self.cave_bg = load_image("cave_bg.png")
-        self.castle_bg = load_image("castle_bg.png")
-        self.desert_bg = load_image("desert_bg.png")
-        self.swamp_bg = load_image("swamp_bg.png")
-        self.beach_bg = load_image("beach_bg.png")
-        self.mountain_bg = load_image("mountain_bg.png")
-        self.map_bg = load_image("world_map.png")
-        
-        # Character sprites
-        self.player_img = load_image("Player.png", 0.5)
-        self.goblin_img = load_image("goblin.png", 0.5)
-        self.wolf_img = load_image("wolf.png", 0.5)
-        self.bandit_img = load_image("bandit.png", 0.5)
-        self.orc_img = load_image("orc.png", 0.5)
-        self.dragon_img = load_image("dragon.png", 0.5)
-        self.skeleton_img = load_image("skeleton.png", 0.5)
-        self.spider_img = load_image("spider.png", 0.5)
-        self.merchant_img = load_image("merchant.png", 0.5)
-        self.blacksmith_img = load_image("blacksmith.png", 0.5)
-        self.quest_giver_img = load_image("quest_giver.png", 0.5)
-        
-        # Item icons
-        self.sword_icon = load_image("sword_icon.png", 0.5)
-        self.armor_icon = load_image("armor_icon.png", 0.5)
-        self.potion_icon = load_image("potion_icon.png", 0.5)
-        self.misc_icon = load_image("misc_icon.png", 0.5)
-        self.gold_icon = load_image("gold_icon.png", 0.5)
-        self.herb_icon = load_image("herb_icon.png", 0.5)
-        self.ore_icon = load_image("ore_icon.png", 0.5)
-        self.scroll_icon = load_image("scroll_icon.png", 0.5)
-        self.key_icon = load_image("key_icon.png", 0.5)
-        
-        # UI elements
-        self.button_img = load_image("button.png", 0.5)
-        self.button_hover_img = load_image("button.png", 0.5)
-        self.quest_icon = load_image("quest_icon.png", 0.5)
-        self.skill_icon = load_image("skill_icon.png", 0.5)
-        self.crafting_icon = load_image("crafting_icon.png", 0.5)
-        
-        # Weather effects
-        self.rain_img = load_image("rain.png", 0.5)
-        self.snow_img = load_image("snow.png", 0.5)
-        
-        # Sounds
+        # Music is streamed by mixer.music, so only the paths are kept
         self.battle_music = "assets/sounds/battle.mp3"
         self.town_music = "assets/sounds/town.mp3"
         self.explore_music = "assets/sounds/explore.mp3"
         self.menu_music = "assets/sounds/menu.mp3"
-        self.rain_sound = load_sound("rain.mp3")
-        self.snow_sound = load_sound("snow.mp3")
-        self.wind_sound = load_sound("wind.mp3")
-        self.attack_sound = load_sound("attack.mp3")
-        self.heal_sound = load_sound("heal.mp3")
-        self.level_up_sound = load_sound("level_up.mp3")
-        self.victory_sound = load_sound("victory.mp3")
-        self.defeat_sound = load_sound("defeat.mp3")
-        self.crafting_sound = load_sound("crafting.mp3")
-        self.quest_complete_sound = load_sound("quest_complete.mp3")
+    
+    def __getattr__(self, name):
+        # Only reached when the asset has not been loaded yet. Sounds are
+        # never stored here so the audio manager can evict them
+        if name in SOUND_ASSETS:
+            return audio.get(SOUND_ASSETS[name])
+        if name in BACKGROUND_ASSETS or name in IMAGE_ASSETS:
+            return self.load(name)
+        raise AttributeError(f"Unknown asset: {name}")
+    
+    def load(self, name):
+        if name in self.__dict__:
+            return self.__dict__[name]
+        if name in SOUND_ASSETS:
+            return audio.get(SOUND_ASSETS[name])
+        if name in BACKGROUND_ASSETS:
+            value = load_background(BACKGROUND_ASSETS[name])
+        else:
+            value = load_image(*IMAGE_ASSETS[name])
+        # Once stored, later lookups are plain attribute hits; if a prefetch
+        # thread raced us, keep whichever copy landed first
+        return self.__dict__.setdefault(name, value)
+    
+    def prefetch(self, screen_name, background=False):
+        names = [n for n in SCREEN_ASSETS.get(screen_name, []) if n not in self.__dict__]
+        if not names:
+            return None
+        if not background:
+            self.load_all(names)
+            return None
+        thread = threading.Thread(target=self.load_all, args=(names,), daemon=True)
+        thread.start()
+        return thread
+    
+    def load_all(self, names):
+        for name in names:
+            self.load(name)
         
 assets = Assets()
+audio = AudioManager()
 
 # Button class
 class Button:
@@ -188,15 +484,23 @@ class Button:
         self.hover_color = hover_color
         self.text_color = text_color
         self.is_hovered = False
+        self.drawn_state = None
+        
+    def get_state(self):
+        return (self.is_hovered, self.text, self.color, self.hover_color, self.text_color)
+        
+    def is_dirty(self):
+        return self.get_state() != self.drawn_state
         
     def draw(self, surface):
         color = self.hover_color if self.is_hovered else self.color
         pygame.draw.rect(surface, color, self.rect, border_radius=5)
         pygame.draw.rect(surface, BLACK, self.rect, 2, border_radius=5)
         
-        text_surf = font_medium.render(self.text, True, self.text_color)
+        text_surf = text_cache.render(font_medium, self.text, True, self.text_color)
         text_rect = text_surf.get_rect(center=self.rect.center)
         surface.blit(text_surf, text_rect)
+        self.drawn_state = self.get_state()
         
     def check_hover(self, pos):
         self.is_hovered = self.rect.collidepoint(pos)
@@ -207,31 +511,109 @@ class Button:
             return self.rect.collidepoint(pos)
         return False
 
-# Item class
-class Item:
-    def __init__(self, name, item_type, stat, value, icon=None, description="", craftable=False, materials=None):
-        self.name = name
-        self.type = item_type  # weapon, armor, potion, misc, material, recipe
-        self.stat = stat  # attack for weapon, defense for armor, heal for potion
-        self.value = value  # gold value
-        self.icon = icon or self.get_default_icon()
-        self.description = description or f"A {item_type} called {name}"
-        self.craftable = craftable
-        self.materials = materials or []
-        
-    def get_default_icon(self):
-        if self.type == "weapon":
-            return assets.sword_icon
-        elif self.type == "armor":
-            return assets.armor_icon
-        elif self.type == "potion":
-            return assets.potion_icon
-        elif self.type == "material":
-            return assets.herb_icon
-        elif self.type == "recipe":
-            return assets.scroll_icon
+# Column of text lines, e.g. the player info panel
+class InfoPanel:
+    def __init__(self, x, y, width, line_height=30, font=None, color=WHITE):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.line_height = line_height
+        self.font = font or font_small
+        self.color = color
+        self.lines = []
+        self.drawn_lines = None
+    
+    @property
+    def rect(self):
+        # Cover whatever was drawn last time as well, so removed lines get erased
+        line_count = max(len(self.lines), len(self.drawn_lines or []))
+        return pygame.Rect(self.x, self.y, self.width, line_count * self.line_height)
+    
+    def set_lines(self, lines):
+        self.lines = lines
+    
+    def is_dirty(self):
+        return self.lines != self.drawn_lines
+    
+    def draw(self, surface):
+        for i, text in enumerate(self.lines):
+            text_surf = text_cache.render(self.font, text, True, self.color)
+            surface.blit(text_surf, (self.x, self.y + i * self.line_height))
+        self.drawn_lines = list(self.lines)
+
+# Dirty-rectangle presentation for menu screens. Clicks and window exposure
+# force a full repaint; otherwise only widgets whose look changed are
+# repainted. The screen's normal draw code is replayed with the clip set to
+# those widgets, so overlapping layers stay correct, and only their rects
+# are pushed to the display. Frames where nothing changed draw nothing.
+class DirtyRegion:
+    def __init__(self):
+        self.full = True
+        self.rects = []
+    
+    def invalidate(self):
+        self.full = True
+    
+    def handle_event(self, event):
+        if event.type in (pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN, pygame.KEYUP, pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+            self.invalidate()
+    
+    def needs_redraw(self, widgets):
+        if self.full:
+            return True
+        self.rects = [widget.rect.copy() for widget in widgets if widget.is_dirty()]
+        return bool(self.rects)
+    
+    def begin(self, surface):
+        if not self.full:
+            surface.set_clip(self.rects[0].unionall(self.rects[1:]))
+    
+    def present(self, surface):
+        surface.set_clip(None)
+        if self.full:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.rects)
+        self.full = False
+        self.rects = []
+
+# Item definition. Items are immutable and interned in item_catalog: there
+# is one Item per item ID, and inventories, shops, loot tables, quest
+# rewards and recipes all hold references to it. Icons are kept as asset
+# names and only loaded when an item is first drawn
+class Item(namedtuple("Item", ["id", "name", "type", "stat", "value", "icon_name", "description", "craftable", "materials"])):
+    __slots__ = ()
+    
+    def __new__(cls, item_id, name, item_type, stat, value, icon_name=None, description="", craftable=False, materials=None):
+        # type: weapon, armor, potion, misc, material, recipe
+        # stat: attack for weapon, defense for armor, heal for potion
+        # value: gold value
+        return super().__new__(cls, item_id, name, item_type, stat, value,
+                               icon_name or cls.default_icon_name(item_type),
+                               description or f"A {item_type} called {name}",
+                               craftable, materials or {})
+    
+    def __hash__(self):
+        return hash(self.id)
+    
+    @property
+    def icon(self):
+        return assets.load(self.icon_name)
+    
+    @staticmethod
+    def default_icon_name(item_type):
+        if item_type == "weapon":
+            return "sword_icon"
+        elif item_type == "armor":
+            return "armor_icon"
+        elif item_type == "potion":
+            return "potion_icon"
+        elif item_type == "material":
+            return "herb_icon"
+        elif item_type == "recipe":
+            return "scroll_icon"
         else:
-            return assets.misc_icon
+            return "misc_icon"
             
     def draw(self, surface, x, y, selected=False):
         # Draw item icon
@@ -243,23 +625,247 @@ class Item:
         
         # Draw item info
         info_y = y + self.icon.get_height() + 5
-        name_text = font_small.render(self.name, True, WHITE)
+        name_text = text_cache.render(font_small, self.name, True, WHITE)
         surface.blit(name_text, (x, info_y))
         
         if self.type == "weapon":
-            stat_text = font_small.render(f"ATK +{self.stat}", True, WHITE)
+            stat_text = text_cache.render(font_small, f"ATK +{self.stat}", True, WHITE)
         elif self.type == "armor":
-            stat_text = font_small.render(f"DEF +{self.stat}", True, WHITE)
+            stat_text = text_cache.render(font_small, f"DEF +{self.stat}", True, WHITE)
         elif self.type == "potion":
-            stat_text = font_small.render(f"HEAL +{self.stat}", True, WHITE)
+            stat_text = text_cache.render(font_small, f"HEAL +{self.stat}", True, WHITE)
         else:
-            stat_text = font_small.render("", True, WHITE)
+            stat_text = text_cache.render(font_small, "", True, WHITE)
             
         surface.blit(stat_text, (x, info_y + 20))
         
-        value_text = font_small.render(f"{self.value}g", True, GOLD)
+        value_text = text_cache.render(font_small, f"{self.value}g", True, GOLD)
         surface.blit(value_text, (x, info_y + 40))
 
+# Every item in the game, keyed by item ID
+class ItemCatalog:
+    def __init__(self):
+        self.items = {}
+        self.names = {}
+        self.legacy = {}  # Items only known from older saves, by ID; every save carries them
+    
+    def define(self, item_id, *args, **kwargs):
+        return self.register(Item(item_id, *args, **kwargs))
+    
+    def register(self, item):
+        self.items[item.id] = item
+        self.names[item.name] = item
+        return item
+    
+    def __getitem__(self, item_id):
+        return self.items[item_id]
+    
+    def __iter__(self):
+        return iter(self.items.values())
+    
+    def named(self, name):
+        return self.names.get(name)
+    
+    def load(self, data):
+        # Saved inventory entry: an item ID, or the full item fields of
+        # older saves. Items from older saves that the game no longer
+        # defines are added to the catalog so they can be found by ID
+        if isinstance(data, str):
+            return self.items[data]
+        return self.names.get(data["name"]) or self.load_legacy((
+            data["name"].lower().replace(" ", "_"),
+            data["name"],
+            data["type"],
+            data["stat"],
+            data["value"],
+            data["description"]
+        ))
+    
+    def load_legacy(self, fields):
+        # Item from an older save, as (id, name, type, stat, value, description)
+        item_id, name, item_type, stat, value, description = fields
+        item = self.items.get(item_id) or self.register(Item(item_id, name, item_type, stat, value,
+                                                             description=description))
+        self.legacy[item_id] = item
+        return item
+    
+    def legacy_fields(self):
+        return [(item.id, item.name, item.type, item.stat, item.value, item.description)
+                for item in self.legacy.values()]
+
+def create_item_catalog():
+    catalog = ItemCatalog()
+    define = catalog.define
+    
+    # Weapons
+    define("wooden_sword", "Wooden Sword", "weapon", 2, 10, "sword_icon", "A basic wooden training sword")
+    define("iron_sword", "Iron Sword", "weapon", 5, 30, "sword_icon", "A standard iron sword")
+    define("steel_sword", "Steel Sword", "weapon", 8, 60, "sword_icon", "A well-made steel sword")
+    define("silver_sword", "Silver Sword", "weapon", 12, 100, "sword_icon", "A sword made of silver, effective against undead")
+    define("dragonbone_sword", "Dragonbone Sword", "weapon", 30, 400, "sword_icon", "A powerful sword made from dragon bones")
+    
+    # Armor
+    define("leather_vest", "Leather Vest", "armor", 3, 20, "armor_icon", "Simple leather armor offering minimal protection")
+    define("chainmail", "Chainmail", "armor", 7, 50, "armor_icon", "Flexible chainmail armor")
+    define("plate_armor", "Plate Armor", "armor", 12, 100, "armor_icon", "Heavy plate armor offering excellent protection")
+    define("silver_armor", "Silver Armor", "armor", 18, 200, "armor_icon", "Armor made of silver, effective against undead")
+    define("dragon_scale_armor", "Dragon Scale Armor", "armor", 25, 300, "armor_icon", "Armor made from dragon scales")
+    
+    # Potions
+    define("small_health_potion", "Small Health Potion", "potion", 20, 15, "potion_icon", "Restores a small amount of health")
+    define("medium_health_potion", "Medium Health Potion", "potion", 35, 25, "potion_icon", "Restores a moderate amount of health")
+    define("large_health_potion", "Large Health Potion", "potion", 60, 40, "potion_icon", "Restores a large amount of health")
+    define("elixir_of_life", "Elixir of Life", "potion", 100, 100, "potion_icon", "Fully restores health")
+    
+    # Materials
+    define("herbs", "Herbs", "material", 0, 5, "herb_icon", "Common herbs used in potion making")
+    define("rare_herbs", "Rare Herbs", "material", 0, 15, "herb_icon", "Rare herbs used in advanced potions")
+    define("iron_ore", "Iron Ore", "material", 0, 10, "ore_icon", "Iron ore that can be smelted")
+    define("silver_ore", "Silver Ore", "material", 0, 30, "ore_icon", "Silver ore that can be smelted")
+    define("dragon_scales", "Dragon Scales", "material", 0, 100, "misc_icon", "Rare scales from a dragon")
+    define("spider_silk", "Spider Silk", "material", 0, 40, "misc_icon", "Strong silk from giant spiders")
+    
+    # Recipes
+    define("health_potion_recipe", "Health Potion Recipe", "recipe", 0, 50, "scroll_icon", 
+           "Teaches how to craft health potions", True, {"Herbs": 3})
+    define("iron_sword_recipe", "Iron Sword Recipe", "recipe", 0, 80, "scroll_icon", 
+           "Teaches how to craft iron swords", True, {"Iron Ore": 2})
+    
+    # Misc
+    define("ancient_key", "Ancient Key", "misc", 0, 0, "key_icon", "An ancient key to unlock hidden areas")
+    define("treasure_map", "Treasure Map", "misc", 0, 50, "misc_icon", "A map leading to hidden treasure")
+    
+    # Enemy loot
+    define("rusty_dagger", "Rusty Dagger", "weapon", 3, 15, "sword_icon")
+    define("short_sword", "Short Sword", "weapon", 5, 30, "sword_icon")
+    define("orcish_axe", "Orcish Axe", "weapon", 8, 60, "sword_icon")
+    define("ancient_sword", "Ancient Sword", "weapon", 10, 80, "sword_icon")
+    define("leather_armor", "Leather Armor", "armor", 4, 40, "armor_icon")
+    define("goblin_ear", "Goblin Ear", "misc", 0, 5, "misc_icon")
+    define("wolf_fang", "Wolf Fang", "misc", 0, 10, "misc_icon")
+    define("wolf_pelt", "Wolf Pelt", "misc", 0, 20, "misc_icon")
+    define("orc_tusk", "Orc Tusk", "misc", 0, 30, "misc_icon")
+    define("bone_fragments", "Bone Fragments", "misc", 0, 20, "misc_icon")
+    define("spider_venom", "Spider Venom", "material", 0, 60, "misc_icon")
+    
+    return catalog
+
+item_catalog = create_item_catalog()
+
+# Shop stock, by item ID
+BLACKSMITH_STOCK = ("wooden_sword", "iron_sword", "steel_sword", "silver_sword", "dragonbone_sword",
+                    "leather_vest", "chainmail", "plate_armor", "silver_armor", "dragon_scale_armor")
+HERBALIST_STOCK = ("small_health_potion", "medium_health_potion", "large_health_potion", "elixir_of_life",
+                   "herbs", "rare_herbs", "iron_ore", "silver_ore", "dragon_scales", "spider_silk")
+
+# Materials found by gathering, by item ID
+GATHERABLE = ("herbs", "iron_ore", "rare_herbs")
+
+# The player's items, stored as a count per item name with an index per
+# item type, so counting, checking and taking items costs the same however
+# many are held. Iterating yields one entry per unit, in the order items
+# were first picked up, like the list it replaces
+class Inventory:
+    def __init__(self, items=()):
+        self.items = {}   # {item_name: item}
+        self.counts = {}  # {item_name: quantity}
+        self.types = {}   # {item_type: {item_name: None}}, in pickup order
+        self.size = 0
+        self.listeners = []  # Called with the item name after each change
+        for item in items:
+            self.add(item)
+    
+    def add(self, item, count=1):
+        name = item.name
+        if name in self.counts:
+            self.counts[name] += count
+        else:
+            self.items[name] = item
+            self.counts[name] = count
+            self.types.setdefault(item.type, {})[name] = None
+        self.size += count
+        for listener in self.listeners:
+            listener(name)
+    
+    def take(self, name, count=1):
+        # Remove `count` of the named item, or nothing if there are fewer
+        if count <= 0:
+            return True
+        held = self.counts.get(name, 0)
+        if held < count:
+            return False
+        if held == count:
+            del self.counts[name]
+            del self.types[self.items.pop(name).type][name]
+        else:
+            self.counts[name] = held - count
+        self.size -= count
+        for listener in self.listeners:
+            listener(name)
+        return True
+    
+    def count(self, name):
+        return self.counts.get(name, 0)
+    
+    def has(self, name, count=1):
+        return self.counts.get(name, 0) >= count
+    
+    def get(self, name):
+        return self.items.get(name)
+    
+    def count_type(self, item_type):
+        counts = self.counts
+        return sum(counts[name] for name in self.types.get(item_type, ()))
+    
+    def of_type(self, item_type):
+        # One entry per unit of each item of the type
+        items = self.items
+        counts = self.counts
+        return [items[name] for name in self.types.get(item_type, ()) for _ in range(counts[name])]
+    
+    def stacks(self):
+        # (item, quantity) pairs in pickup order
+        items = self.items
+        return [(items[name], count) for name, count in self.counts.items()]
+    
+    def __iter__(self):
+        for item, count in self.stacks():
+            for _ in range(count):
+                yield item
+    
+    def __len__(self):
+        return self.size
+    
+    def __contains__(self, item):
+        return item.name in self.counts
+
+# Grid cell showing an item, e.g. a crafting recipe result
+class ItemCell:
+    def __init__(self, item, x, y):
+        self.item = item
+        self.x = x
+        self.y = y
+        self.selected = False
+        self.unavailable = False
+        self.drawn_state = None
+    
+    @property
+    def rect(self):
+        # Icon, selection border and the three info lines below it
+        icon = self.item.icon
+        return pygame.Rect(self.x - 2, self.y - 2, max(icon.get_width(), 100) + 4, icon.get_height() + 69)
+    
+    def is_dirty(self):
+        return (self.selected, self.unavailable) != self.drawn_state
+    
+    def draw(self, surface):
+        self.item.draw(surface, self.x, self.y, self.selected)
+        
+        # Draw indicator if unavailable
+        if self.unavailable:
+            pygame.draw.rect(surface, (255, 0, 0, 100), (self.x, self.y, 100, 100))
+        self.drawn_state = (self.selected, self.unavailable)
+
 # Quest class
 class Quest:
     def __init__(self, title, description, objective, reward_exp, reward_gold, reward_items=None, required_item=None, required_kills=None):
@@ -274,6 +880,7 @@ class Quest:
         self.completed = False
         self.turned_in = False
         self.current_kills = {}
+        self.current_items = 0  # Held count of the required item, kept by QuestTracker
         
         if required_kills:
             for enemy in required_kills:
@@ -285,14 +892,20 @@ class Quest:
             return self.check_completion()
         return False
     
+    def update_items(self, count):
+        self.current_items = count
+        return self.check_completion()
+    
     def check_completion(self):
-        if self.completed:
+        # Kill progress only grows, but the required items can still be
+        # used or sold before the quest is turned in
+        if self.completed and not self.required_item:
             return True
             
         # Check item requirement
         item_complete = True
         if self.required_item:
-            item_complete = False
+            item_complete = self.current_items >= self.required_item[1]
         
         # Check kill requirements
         kill_complete = True
@@ -305,6 +918,49 @@ class Quest:
         self.completed = item_complete and kill_complete
         return self.completed
 
+# Active quest objectives indexed by what advances them, so a kill or a
+# change in an item count only touches the quests waiting on that enemy
+# or item. Item objectives follow the inventory through its listeners
+class QuestTracker:
+    def __init__(self, inventory):
+        self.inventory = inventory
+        self.by_enemy = {}  # {enemy_name: {quest: None}}
+        self.by_item = {}   # {item_name: {quest: None}}
+        self.listeners = []  # Called with the quest after kill progress
+        inventory.listeners.append(self.item_changed)
+    
+    def add(self, quest):
+        for enemy_name in quest.required_kills or ():
+            self.by_enemy.setdefault(enemy_name, {})[quest] = None
+        if quest.required_item:
+            item_name = quest.required_item[0]
+            self.by_item.setdefault(item_name, {})[quest] = None
+            quest.update_items(self.inventory.count(item_name))
+    
+    def remove(self, quest):
+        for enemy_name in quest.required_kills or ():
+            self.by_enemy[enemy_name].pop(quest, None)
+        if quest.required_item:
+            self.by_item[quest.required_item[0]].pop(quest, None)
+    
+    def enemy_killed(self, enemy_name):
+        # Returns the quests this kill completed
+        completed = []
+        for quest in self.by_enemy.get(enemy_name, ()):
+            if not quest.completed:
+                if quest.update_kill(enemy_name):
+                    completed.append(quest)
+                for listener in self.listeners:
+                    listener(quest)
+        return completed
+    
+    def item_changed(self, item_name):
+        quests = self.by_item.get(item_name)
+        if quests:
+            count = self.inventory.count(item_name)
+            for quest in quests:
+                quest.update_items(count)
+
 # Skill class
 class Skill:
     def __init__(self, name, description, max_level, stat_effects, required_level=1, parent_skill=None):
@@ -330,6 +986,21 @@ class Skill:
             return self.stat_effects
         return {}
 
+def create_skills():
+    # Combat skills
+    sword_mastery = Skill("Sword Mastery", "Increases attack with swords", 5, {"attack": 2})
+    heavy_armor = Skill("Heavy Armor", "Increases defense with heavy armor", 5, {"defense": 3})
+    dual_wielding = Skill("Dual Wielding", "Allows wielding two one-handed weapons", 1, {}, 5, sword_mastery)
+    
+    # Crafting skills
+    blacksmithing = Skill("Blacksmithing", "Allows crafting better weapons and armor", 5, {})
+    alchemy = Skill("Alchemy", "Allows crafting better potions", 5, {})
+    
+    # Exploration skills
+    survival = Skill("Survival", "Reduces weather effects and increases exploration rewards", 5, {"weather_resistance": 5})
+    
+    return [sword_mastery, heavy_armor, dual_wielding, blacksmithing, alchemy, survival]
+
 # Crafting Recipe class
 class CraftingRecipe:
     def __init__(self, name, result_item, materials_required, skill_required=None, skill_level=0):
@@ -342,8 +1013,7 @@ class CraftingRecipe:
     def can_craft(self, player_inventory, player_skills=None):
         # Check materials
         for item_name, quantity in self.materials_required.items():
-            item_count = sum(1 for item in player_inventory if item.name == item_name)
-            if item_count < quantity:
+            if not player_inventory.has(item_name, quantity):
                 return False
         
         # Check skill if required
@@ -353,10 +1023,83 @@ class CraftingRecipe:
                 return False
                 
         return True
+    
+    def craft(self, player):
+        # Remove materials
+        for mat_name, quantity in self.materials_required.items():
+            player.inventory.take(mat_name, min(quantity, player.inventory.count(mat_name)))
+        
+        # Add crafted item
+        player.add_item(self.result_item)
+        return self.result_item
+
+# Keeps every recipe's craftability up to date as the player's items and
+# skills change, so screens read a cached status instead of rechecking
+# each recipe against the inventory every frame. Only recipes using the
+# changed item or skill are updated
+class CraftingTracker:
+    def __init__(self, player, recipes):
+        self.player = player
+        self.recipes = recipes
+        self.missing = {}    # {recipe: {item_name: quantity still needed}}
+        self.skill_met = {}  # {recipe: skill requirement met}
+        
+        self.by_material = {}
+        self.by_skill = {}
+        for recipe in recipes:
+            for item_name in recipe.materials_required:
+                self.by_material.setdefault(item_name, []).append(recipe)
+            if recipe.skill_required:
+                self.by_skill.setdefault(recipe.skill_required, []).append(recipe)
+            
+            self.missing[recipe] = {}
+            for item_name in recipe.materials_required:
+                self.update_material(recipe, item_name)
+            self.update_skill(recipe)
+        
+        player.inventory.listeners.append(self.item_changed)
+        player.skill_listeners.append(self.skill_changed)
+    
+    def close(self):
+        self.player.inventory.listeners.remove(self.item_changed)
+        self.player.skill_listeners.remove(self.skill_changed)
+    
+    def update_material(self, recipe, item_name):
+        short = recipe.materials_required[item_name] - self.player.inventory.count(item_name)
+        if short > 0:
+            self.missing[recipe][item_name] = short
+        else:
+            self.missing[recipe].pop(item_name, None)
+    
+    def update_skill(self, recipe):
+        if recipe.skill_required:
+            skill = next((s for s in self.player.skills if s.name == recipe.skill_required), None)
+            self.skill_met[recipe] = bool(skill) and skill.current_level >= recipe.skill_level
+        else:
+            self.skill_met[recipe] = True
+    
+    def item_changed(self, item_name):
+        for recipe in self.by_material.get(item_name, ()):
+            self.update_material(recipe, item_name)
+    
+    def skill_changed(self, skill_name):
+        for recipe in self.by_skill.get(skill_name, ()):
+            self.update_skill(recipe)
+    
+    def can_craft(self, recipe):
+        return self.skill_met[recipe] and not self.missing[recipe]
+    
+    def status(self, recipe):
+        # Lines describing what stops the recipe being crafted
+        lines = [f"Missing {short} of {recipe.materials_required[item_name]} {item_name}"
+                 for item_name, short in self.missing[recipe].items()]
+        if not self.skill_met[recipe]:
+            lines.append(f"Need {recipe.skill_required} level {recipe.skill_level}")
+        return lines
 
 # Player class with new features
 class Player:
-    def __init__(self, name):
+    def __init__(self, name, starter_kit=True):
         self.name = name
         self.level = 1
         self.exp = 0
@@ -366,7 +1109,7 @@ class Player:
         self.attack = 10
         self.defense = 5
         self.gold = 50
-        self.inventory = []
+        self.inventory = Inventory()
         self.equipped_weapon = None
         self.equipped_armor = None
         self.location = "Starting Forest"
@@ -374,23 +1117,40 @@ class Player:
         self.locations_unlocked = ["Starting Forest", "Greenfield Town"]
         self.quests = []
         self.active_quests = []
-        self.completed_quests = []
+        self.turned_in_quests = []
+        self.unloaded_turned_in = []  # Saved entries of turned-in quests, built on first use
         self.skills = []
+        self.skill_listeners = []  # Called with the skill name after an upgrade
+        self.quest_tracker = QuestTracker(self.inventory)
+        
+        # Changes since the last save, appended to the save journal
+        self.changed_items = {}   # {item_name: None}
+        self.changed_quests = {}  # {quest: None}
+        self.changed_skills = {}  # {skill_name: None}
+        self.journal_generation = None  # None until the player has a full save
+        self.journal_records = 0
+        self.save_path = SAVE_PATH  # Slot file this game saves to
+        self.inventory.listeners.append(self.item_changed)
+        self.quest_tracker.listeners.append(self.quest_changed)
         self.reputation = 0  # -100 to 100 scale
         self.play_time = 0  # in seconds
         self.game_start_time = time.time()
         self.weather_resistance = 0  # Reduces weather effects
         self.weather = Weather.CLEAR
         self.time_of_day = TimeOfDay.DAY
+        self.time_blend = 0.0  # 0-1 progress into the next time of day
         self.day_count = 1
+        self.weather_period = 0  # Last 10 second period weather was rolled for
         
         # Initialize skills
         self.init_skills()
         
-        # Starting items
-        wooden_sword = Item("Wooden Sword", "weapon", 2, 5, assets.sword_icon, "A basic wooden training sword")
-        leather_armor = Item("Leather Vest", "armor", 3, 20, assets.armor_icon, "Simple leather armor offering minimal protection")
-        health_potion = Item("Small Health Potion", "potion", 20, 15, assets.potion_icon, "Restores a small amount of health")
+        # Starting items, unless a save is about to fill in the player
+        if not starter_kit:
+            return
+        wooden_sword = item_catalog["wooden_sword"]
+        leather_armor = item_catalog["leather_vest"]
+        health_potion = item_catalog["small_health_potion"]
         
         self.add_item(wooden_sword)
         self.add_item(leather_armor)
@@ -398,20 +1158,29 @@ class Player:
         self.equip_item(wooden_sword)
         self.equip_item(leather_armor)
     
+    @property
+    def completed_quests(self):
+        # Quests turned in before the last load are only rebuilt when
+        # something asks for them, e.g. the quest screen
+        if self.unloaded_turned_in:
+            definitions = {quest.title: quest for quest in create_quests()}
+            loaded = []
+            for title, state, completed, kills in self.unloaded_turned_in:
+                quest = definitions.get(title)
+                if quest:
+                    quest.completed = completed
+                    quest.turned_in = True
+                    quest.current_kills.update(kills)
+                    loaded.append(quest)
+            self.turned_in_quests[:0] = loaded
+            self.unloaded_turned_in = []
+        return self.turned_in_quests
+    
+    def has_turned_in(self, quest):
+        return quest in self.turned_in_quests or any(entry[0] == quest.title for entry in self.unloaded_turned_in)
+    
     def init_skills(self):
-        # Combat skills
-        sword_mastery = Skill("Sword Mastery", "Increases attack with swords", 5, {"attack": 2})
-        heavy_armor = Skill("Heavy Armor", "Increases defense with heavy armor", 5, {"defense": 3})
-        dual_wielding = Skill("Dual Wielding", "Allows wielding two one-handed weapons", 1, {}, 5, sword_mastery)
-        
-        # Crafting skills
-        blacksmithing = Skill("Blacksmithing", "Allows crafting better weapons and armor", 5, {})
-        alchemy = Skill("Alchemy", "Allows crafting better potions", 5, {})
-        
-        # Exploration skills
-        survival = Skill("Survival", "Reduces weather effects and increases exploration rewards", 5, {"weather_resistance": 5})
-        
-        self.skills = [sword_mastery, heavy_armor, dual_wielding, blacksmithing, alchemy, survival]
+        self.skills = create_skills()
     
     def update(self):
         # Update play time
@@ -421,25 +1190,40 @@ class Player:
         time_segment = (self.play_time % 600) / 600  # 10 minutes = 600 seconds
         if time_segment < 0.1:
             self.time_of_day = TimeOfDay.DAWN
+            phase_end = 0.1
         elif time_segment < 0.4:
             self.time_of_day = TimeOfDay.DAY
+            phase_end = 0.4
         elif time_segment < 0.5:
             self.time_of_day = TimeOfDay.DUSK
+            phase_end = 0.5
         else:
             self.time_of_day = TimeOfDay.NIGHT
+            phase_end = 1.0
             self.day_count = int(self.play_time // 600) + 1
         
-        # Random weather changes (10% chance every 10 seconds)
-        if random.random() < 0.1 and int(self.play_time) % 10 == 0:
-            weather_roll = random.random()
-            if weather_roll < 0.6:
-                self.weather = Weather.CLEAR
-            elif weather_roll < 0.8:
-                self.weather = Weather.RAIN
-            elif weather_roll < 0.95:
-                self.weather = Weather.SNOW
-            else:
-                self.weather = Weather.SANDSTORM
+        # Fade towards the next time of day over the end of each phase
+        seconds_left = (phase_end - time_segment) * 600
+        self.time_blend = max(0.0, 1 - seconds_left / TIME_TRANSITION)
+        
+        # Random weather changes (10% chance every 10 seconds). update runs
+        # every frame, so roll once per 10 second period
+        weather_period = int(self.play_time) // 10
+        if weather_period != self.weather_period:
+            self.weather_period = weather_period
+            if game_rng.weather.random() < 0.1:
+                self.roll_weather()
+    
+    def roll_weather(self, rng=None):
+        weather_roll = (rng or game_rng).weather.random()
+        if weather_roll < 0.6:
+            self.weather = Weather.CLEAR
+        elif weather_roll < 0.8:
+            self.weather = Weather.RAIN
+        elif weather_roll < 0.95:
+            self.weather = Weather.SNOW
+        else:
+            self.weather = Weather.SANDSTORM
     
     def add_exp(self, amount):
         self.exp += amount
@@ -460,13 +1244,7 @@ class Player:
         
     def take_damage(self, damage):
         # Weather can affect combat
-        weather_multiplier = 1.0
-        if self.weather == Weather.RAIN:
-            weather_multiplier = 0.9  # Rain makes combat slightly easier
-        elif self.weather == Weather.SANDSTORM:
-            weather_multiplier = 1.2  # Sandstorm makes combat harder
-        
-        actual_damage = max(1, (damage - self.defense) * weather_multiplier)
+        actual_damage = max(1, (damage - self.defense) * combat.PLAYER_DAMAGE_MULTIPLIERS[self.weather.value])
         self.hp -= actual_damage
         return actual_damage
         
@@ -499,12 +1277,12 @@ class Player:
             self.equipped_armor = None
         
     def add_item(self, item):
-        self.inventory.append(item)
+        self.inventory.add(item)
         
     def use_item(self, item):
         if item.type == "potion":
             self.heal(item.stat)
-            self.inventory.remove(item)
+            self.inventory.take(item.name)
             return True
         return False
         
@@ -518,8 +1296,9 @@ class Player:
         return False
     
     def add_quest(self, quest):
-        if quest not in self.quests and quest not in self.active_quests and quest not in self.completed_quests:
+        if quest not in self.quests and quest not in self.active_quests and not self.has_turned_in(quest):
             self.quests.append(quest)
+            self.quest_changed(quest)
             return True
         return False
     
@@ -527,13 +1306,22 @@ class Player:
         if quest in self.quests:
             self.quests.remove(quest)
             self.active_quests.append(quest)
+            self.quest_tracker.add(quest)
+            self.quest_changed(quest)
             return True
         return False
     
     def complete_quest(self, quest):
         if quest in self.active_quests and quest.completed:
             self.active_quests.remove(quest)
-            self.completed_quests.append(quest)
+            self.turned_in_quests.append(quest)
+            self.quest_tracker.remove(quest)
+            quest.turned_in = True
+            self.quest_changed(quest)
+            
+            # Hand over collected items
+            if quest.required_item:
+                self.inventory.take(*quest.required_item)
             
             # Give rewards
             self.add_exp(quest.reward_exp)
@@ -564,11 +1352,30 @@ class Player:
                 elif stat == "weather_resistance":
                     self.weather_resistance += value
             
+            self.changed_skills[skill_name] = None
+            for listener in self.skill_listeners:
+                listener(skill_name)
             return True
         return False
     
-    def save_game(self, filename="savegame.json"):
-        save_data = {
+    # The player as plain values, packed by savefile
+    def snapshot(self):
+        quests = [(q.title, savefile.AVAILABLE, q.completed, dict(q.current_kills)) for q in self.quests]
+        quests += [(q.title, savefile.ACTIVE, q.completed, dict(q.current_kills)) for q in self.active_quests]
+        quests += self.unloaded_turned_in
+        quests += [(q.title, savefile.TURNED_IN, q.completed, dict(q.current_kills)) for q in self.turned_in_quests]
+        snapshot = self.fields()
+        snapshot.update({
+            "inventory": [(item.id, count) for item, count in self.inventory.stacks()],
+            "legacy_items": item_catalog.legacy_fields(),
+            "quests": quests,
+            "skills": [(s.name, s.current_level) for s in self.skills]
+        })
+        return snapshot
+    
+    # Everything but the inventory, quests and skills
+    def fields(self):
+        return {
             "name": self.name,
             "level": self.level,
             "exp": self.exp,
@@ -578,192 +1385,324 @@ class Player:
             "attack": self.attack,
             "defense": self.defense,
             "gold": self.gold,
-            "inventory": [{"name": item.name, "type": item.type, "stat": item.stat, 
-                          "value": item.value, "description": item.description} 
-                         for item in self.inventory],
-            "equipped_weapon": self.equipped_weapon.name if self.equipped_weapon else None,
-            "equipped_armor": self.equipped_armor.name if self.equipped_armor else None,
-            "location": self.location,
-            "locations_unlocked": self.locations_unlocked,
-            "quests": [{
-                "title": q.title,
-                "description": q.description,
-                "objective": q.objective,
-                "reward_exp": q.reward_exp,
-                "reward_gold": q.reward_gold,
-                "reward_items": [{"name": i.name, "type": i.type, "stat": i.stat, 
-                                 "value": i.value, "description": i.description} 
-                                for i in q.reward_items],
-                "required_item": q.required_item,
-                "required_kills": q.required_kills,
-                "completed": q.completed,
-                "turned_in": q.turned_in,
-                "current_kills": q.current_kills
-            } for q in self.quests + self.active_quests + self.completed_quests],
-            "skills": [{
-                "name": s.name,
-                "description": s.description,
-                "max_level": s.max_level,
-                "current_level": s.current_level,
-                "stat_effects": s.stat_effects,
-                "required_level": s.required_level,
-                "parent_skill": s.parent_skill.name if s.parent_skill else None
-            } for s in self.skills],
             "reputation": self.reputation,
             "play_time": self.play_time,
-            "day_count": self.day_count
+            "day_count": self.day_count,
+            "weather_resistance": self.weather_resistance,
+            "location": self.location,
+            "locations_unlocked": list(self.locations_unlocked),
+            "equipped_weapon": self.equipped_weapon.id if self.equipped_weapon else None,
+            "equipped_armor": self.equipped_armor.id if self.equipped_armor else None,
+            "rng_seed": game_rng.seed
         }
+    
+    def item_changed(self, item_name):
+        self.changed_items[item_name] = None
+    
+    def quest_changed(self, quest):
+        self.changed_quests[quest] = None
+    
+    def clear_changes(self):
+        self.changed_items.clear()
+        self.changed_quests.clear()
+        self.changed_skills.clear()
+    
+    def save_game(self, filename=None, background=False):
+        # Full save, starting a new journal. In the background the snapshot
+        # is taken here and save_worker packs and writes it
+        filename = filename or self.save_path
+        generation = (self.journal_generation or 0) + 1
+        
+        # Reseed from a fresh seed the save records, so loading it
+        # continues with exactly the rolls this session makes from here on
+        game_rng.fork_seed()
+        snapshot = self.snapshot()
+        snapshot["journal_generation"] = generation
+        if background:
+            save_worker.save(filename, snapshot)
+        else:
+            save_worker.flush()
+            try:
+                savefile.write(filename, snapshot)
+                savefile.reset_journal(filename, generation)
+            except (OSError, struct.error):
+                return False
+        self.journal_generation = generation
+        self.journal_records = 0
+        self.clear_changes()
+        return True
+    
+    def save_journal(self, filename=None, background=False):
+        # Append what changed since the last save to the journal. Falls back
+        # to a full save, which compacts the journal, when there is no full
+        # save yet or the journal holds JOURNAL_COMPACT_RECORDS records
+        filename = filename or self.save_path
+        if save_worker.error:
+            # A background write failed, so the journal may be missing records
+            save_worker.error = None
+            self.journal_generation = None
+        if self.journal_generation is None or self.journal_records >= JOURNAL_COMPACT_RECORDS:
+            return self.save_game(filename, background)
+        
+        game_rng.fork_seed()  # As in save_game
+        records = [savefile.player_record(self.fields())]
+        for item_name in self.changed_items:
+            item = self.inventory.get(item_name) or item_catalog.named(item_name)
+            if item:
+                records.append(savefile.item_record(item.id, self.inventory.count(item_name)))
+        for quest in self.changed_quests:
+            if quest.turned_in:
+                state = savefile.TURNED_IN
+            elif quest in self.active_quests:
+                state = savefile.ACTIVE
+            else:
+                state = savefile.AVAILABLE
+            records.append(savefile.quest_record((quest.title, state, quest.completed, dict(quest.current_kills))))
+        for skill in self.skills:
+            if skill.name in self.changed_skills:
+                records.append(savefile.skill_record(skill.name, skill.current_level))
+        
+        if background:
+            save_worker.save(filename, records=records)
+        else:
+            save_worker.flush()
+            try:
+                savefile.append_journal(filename, records)
+            except (OSError, struct.error):
+                return False
+        self.journal_records += len(records)
+        self.clear_changes()
+        return True
+    
+    @staticmethod
+    def read_save(filename=SAVE_PATH, progress=None):
+        # Parse a save file and its journal into a snapshot. Touches nothing
+        # in pygame, so LoadingScene runs it on a worker thread. Returns the
+        # snapshot and the journal's (length, record count), or None if it
+        # has no journal
+        save_worker.flush()
+        if not savefile.is_save_file(filename):
+            return json_save_snapshot(json.loads(savefile.read_file(filename, progress))), None
+        
+        snapshot = savefile.read(filename, progress)
+        journal = savefile.replay_journal(filename, snapshot)
+        if journal:
+            # Drop a torn record so later appends stay readable
+            os.truncate(savefile.journal_path(filename), journal[0])
+        return snapshot, journal
+    
+    @classmethod
+    def from_save(cls, snapshot, journal):
+        player = cls.from_snapshot(snapshot)
         
-        try:
-            with open(filename, 'w') as f:
-                json.dump(save_data, f, indent=4)
-            return True
-        except:
-            return False
+        # Without a journal for this save the next save must be a full one
+        if journal:
+            player.journal_generation = snapshot["journal_generation"]
+            player.journal_records = journal[1]
+        return player
     
     @classmethod
-    def load_game(cls, filename="savegame.json"):
-        try:
-            with open(filename, 'r') as f:
-                save_data = json.load(f)
-            
-            player = cls(save_data["name"])
-            player.level = save_data["level"]
-            player.exp = save_data["exp"]
-            player.exp_to_level = save_data["exp_to_level"]
-            player.hp = save_data["hp"]
-            player.max_hp = save_data["max_hp"]
-            player.attack = save_data["attack"]
-            player.defense = save_data["defense"]
-            player.gold = save_data["gold"]
-            player.location = save_data["location"]
-            player.locations_unlocked = save_data["locations_unlocked"]
-            player.reputation = save_data["reputation"]
-            player.play_time = save_data["play_time"]
-            player.day_count = save_data["day_count"]
-            
-            # Rebuild inventory
-            player.inventory = []
-            for item_data in save_data["inventory"]:
-                item = Item(
-                    item_data["name"],
-                    item_data["type"],
-                    item_data["stat"],
-                    item_data["value"],
-                    description=item_data["description"]
-                )
-                player.inventory.append(item)
-            
-            # Rebuild equipped items
-            if save_data["equipped_weapon"]:
-                weapon = next((i for i in player.inventory if i.name == save_data["equipped_weapon"]), None)
-                if weapon:
-                    player.equip_item(weapon)
-            
-            if save_data["equipped_armor"]:
-                armor = next((i for i in player.inventory if i.name == save_data["equipped_armor"]), None)
-                if armor:
-                    player.equip_item(armor)
-            
-            # Rebuild quests
-            player.quests = []
-            player.active_quests = []
-            player.completed_quests = []
-            
-            for quest_data in save_data["quests"]:
-                reward_items = []
-                for item_data in quest_data["reward_items"]:
-                    item = Item(
-                        item_data["name"],
-                        item_data["type"],
-                        item_data["stat"],
-                        item_data["value"],
-                        description=item_data["description"]
-                    )
-                    reward_items.append(item)
-                
-                quest = Quest(
-                    quest_data["title"],
-                    quest_data["description"],
-                    quest_data["objective"],
-                    quest_data["reward_exp"],
-                    quest_data["reward_gold"],
-                    reward_items,
-                    quest_data["required_item"],
-                    quest_data["required_kills"]
-                )
-                quest.completed = quest_data["completed"]
-                quest.turned_in = quest_data["turned_in"]
-                quest.current_kills = quest_data["current_kills"]
-                
-                if not quest.turned_in:
-                    if quest.completed:
-                        player.active_quests.append(quest)
-                    else:
-                        player.quests.append(quest)
-                else:
-                    player.completed_quests.append(quest)
-            
-            # Rebuild skills
-            player.skills = []
-            for skill_data in save_data["skills"]:
-                skill = Skill(
-                    skill_data["name"],
-                    skill_data["description"],
-                    skill_data["max_level"],
-                    skill_data["stat_effects"],
-                    skill_data["required_level"]
-                )
-                skill.current_level = skill_data["current_level"]
-                player.skills.append(skill)
-            
-            # Rebuild skill parent relationships
-            for skill_data in save_data["skills"]:
-                if skill_data["parent_skill"]:
-                    child = next(s for s in player.skills if s.name == skill_data["name"])
-                    parent = next(s for s in player.skills if s.name == skill_data["parent_skill"])
-                    child.parent_skill = parent
+    def from_snapshot(cls, snapshot):
+        # Build the player straight from saved state: no starter kit, and
+        # every item, quest and skill found by a dict lookup
+        player = cls(snapshot["name"], starter_kit=False)
+        player.level = snapshot["level"]
+        player.exp = snapshot["exp"]
+        player.exp_to_level = snapshot["exp_to_level"]
+        player.hp = snapshot["hp"]
+        player.max_hp = snapshot["max_hp"]
+        player.attack = snapshot["attack"]
+        player.defense = snapshot["defense"]
+        player.gold = snapshot["gold"]
+        player.reputation = snapshot["reputation"]
+        player.play_time = snapshot["play_time"]
+        player.day_count = snapshot["day_count"]
+        player.weather_resistance = snapshot["weather_resistance"]
+        player.location = snapshot["location"]
+        player.locations_unlocked = snapshot["locations_unlocked"]
+        
+        # Continue with the random rolls the saved session would have made
+        if snapshot.get("rng_seed") is not None:
+            game_rng.reseed(snapshot["rng_seed"])
+        
+        # Rebuild inventory, after defining the items older saves brought in
+        for fields in snapshot.get("legacy_items", ()):
+            item_catalog.load_legacy(fields)
+        items = item_catalog.items
+        for item_id, count in snapshot["inventory"]:
+            item = items.get(item_id)
+            if item:
+                player.inventory.add(item, count)
+            else:
+                print(f"Unknown item {item_id} in save, dropped")
+        
+        # Saved attack and defense already include the equipped items
+        player.equipped_weapon = items.get(snapshot["equipped_weapon"])
+        player.equipped_armor = items.get(snapshot["equipped_armor"])
+        
+        # Rebuild open quests from their definitions; turned-in ones wait
+        # for completed_quests
+        player.unloaded_turned_in = [entry for entry in snapshot["quests"] if entry[1] == savefile.TURNED_IN]
+        definitions = {quest.title: quest for quest in create_quests()}
+        for title, state, completed, kills in snapshot["quests"]:
+            if state == savefile.TURNED_IN:
+                continue
+            quest = definitions.get(title)
+            if not quest:
+                continue
+            quest.completed = completed
+            quest.current_kills.update(kills)
             
-            player.game_start_time = time.time() - player.play_time
-            return player
-        except:
-            return None
-
-# Enemy class with weather effects
-class Enemy:
-    def __init__(self, name, level, hp, attack, defense, exp_reward, gold_reward, image, boss=False):
-        self.name = name
-        self.level = level
-        self.hp = hp
-        self.max_hp = hp
-        self.attack = attack
-        self.defense = defense
-        self.exp_reward = exp_reward
-        self.gold_reward = gold_reward
-        self.loot_table = []
-        self.image = image
-        self.boss = boss
-        self.weather_effects = {
-            Weather.RAIN: {"attack_multiplier": 0.9, "defense_multiplier": 1.0},
-            Weather.SNOW: {"attack_multiplier": 1.0, "defense_multiplier": 1.1},
-            Weather.SANDSTORM: {"attack_multiplier": 1.1, "defense_multiplier": 0.9},
-            Weather.CLEAR: {"attack_multiplier": 1.0, "defense_multiplier": 1.0}
-        }
+            if state == savefile.AVAILABLE:
+                player.quests.append(quest)
+            else:
+                player.active_quests.append(quest)
+                player.quest_tracker.add(quest)
         
-    def add_loot(self, item, chance):
-        self.loot_table.append((item, chance))
+        # Restore skill levels
+        levels = dict(snapshot["skills"])
+        for skill in player.skills:
+            skill.current_level = levels.get(skill.name, 0)
         
-    def generate_loot(self):
+        player.game_start_time = time.time() - player.play_time
+        player.clear_changes()
+        return player
+
+# Snapshot from a JSON save written by older versions of the game
+def json_save_snapshot(save_data):
+    inventory = {}
+    for item_data in save_data["inventory"]:
+        item_id = item_catalog.load(item_data).id
+        inventory[item_id] = inventory.get(item_id, 0) + 1
+    
+    def item_id(name):
+        item = item_catalog.named(name) if name else None
+        return item.id if item else None
+    
+    quests = []
+    for quest_data in save_data["quests"]:
+        if quest_data["turned_in"]:
+            state = savefile.TURNED_IN
+        elif quest_data["completed"]:
+            state = savefile.ACTIVE
+        else:
+            state = savefile.AVAILABLE
+        quests.append((quest_data["title"], state, quest_data["completed"], quest_data["current_kills"]))
+    
+    snapshot = {field: save_data[field] for field in ("name", "level", "exp", "exp_to_level", "hp", "max_hp",
+                                                      "attack", "defense", "gold", "reputation", "play_time",
+                                                      "day_count", "location", "locations_unlocked")}
+    
+    # Older saves don't store weather resistance, so add it up from the skills
+    skills = [(skill_data["name"], skill_data["current_level"]) for skill_data in save_data["skills"]]
+    effects = {skill.name: skill.stat_effects for skill in create_skills()}
+    weather_resistance = sum(effects.get(name, {}).get("weather_resistance", 0) * level for name, level in skills)
+    
+    snapshot.update({
+        "weather_resistance": weather_resistance,
+        "equipped_weapon": item_id(save_data["equipped_weapon"]),
+        "equipped_armor": item_id(save_data["equipped_armor"]),
+        "inventory": list(inventory.items()),
+        "quests": quests,
+        "skills": skills,
+        "rng_seed": save_data.get("rng_seed")
+    })
+    return snapshot
+
+# Path of the first free save slot, for a new game
+def new_save_slot():
+    os.makedirs(SAVE_DIR, exist_ok=True)
+    taken = set(os.listdir(SAVE_DIR))
+    slot = 1
+    while f"slot{slot:03d}.sav" in taken:
+        slot += 1
+    return os.path.join(SAVE_DIR, f"slot{slot:03d}.sav")
+
+# Every save as (path, header), most recently saved first, reading only
+# each file's slot header. The header is None for saves that can't be
+# summarised: JSON saves from older versions and damaged files
+def list_save_slots():
+    save_worker.flush()
+    paths = []
+    if os.path.isdir(SAVE_DIR):
+        paths = [os.path.join(SAVE_DIR, name) for name in os.listdir(SAVE_DIR) if name.endswith(".sav")]
+    paths += [path for path in (SAVE_PATH, LEGACY_SAVE_PATH) if os.path.exists(path)]
+    
+    slots = []
+    for path in paths:
+        try:
+            header = savefile.read_header(path)
+        except (OSError, struct.error, savefile.SaveError):
+            header = None
+        slots.append((path, header))
+    slots.sort(key=lambda slot: slot[1]["saved_at"] if slot[1] else os.path.getmtime(slot[0]), reverse=True)
+    return slots
+
+def save_slot_label(path, header):
+    if not header:
+        return f"{os.path.basename(path)} (no details)"
+    minutes, seconds = divmod(int(header["play_time"]), 60)
+    return (f"{header['name']}  Lv {header['level']}  {header['location']}  "
+            f"Day {header['day_count']}  {minutes // 60}:{minutes % 60:02d}:{seconds:02d}")
+
+# Immutable enemy definition, built once by create_enemies and shared by
+# every fight. loot_table is a tuple of (item, chance) pairs; the sprite is
+# an asset name, loaded when the enemy is first drawn
+EnemyTemplate = namedtuple("EnemyTemplate", ["name", "level", "hp", "attack", "defense", "exp_reward",
+                                             "gold_reward", "image_name", "boss", "loot_table"],
+                           defaults=(False, ()))
+
+# One enemy in one fight. Only the numbers a fight changes live on the
+# instance; everything else is read from its template
+class Enemy:
+    __slots__ = ("template", "name", "level", "hp", "max_hp", "attack", "defense", "exp_reward", "gold_reward")
+    
+    def __init__(self, template):
+        self.template = template
+        self.name = template.name
+        self.level = template.level
+        self.hp = template.hp
+        self.max_hp = template.hp
+        self.attack = template.attack
+        self.defense = template.defense
+        self.exp_reward = template.exp_reward
+        self.gold_reward = template.gold_reward
+    
+    @classmethod
+    def scaled(cls, template, level):
+        # Stats scaled to `level`, as used for random encounters
+        enemy = cls(template)
+        enemy.level = level
+        enemy.hp = enemy.max_hp = 30 * level
+        enemy.attack = 8 * level
+        enemy.defense = 2 * level
+        enemy.exp_reward = 25 * level
+        enemy.gold_reward = 10 * level
+        return enemy
+    
+    @property
+    def image(self):
+        return assets.load(self.template.image_name)
+    
+    @property
+    def boss(self):
+        return self.template.boss
+    
+    @property
+    def loot_table(self):
+        return self.template.loot_table
+        
+    def generate_loot(self, rng=None):
+        roll = (rng or game_rng).loot.random
         loot = []
-        for item, chance in self.loot_table:
-            if random.random() < chance:
+        for item, chance in self.template.loot_table:
+            if roll() < chance:
                 loot.append(item)
         return loot
         
     def take_damage(self, damage, weather):
         # Apply weather effects
-        weather_effect = self.weather_effects.get(weather, self.weather_effects[Weather.CLEAR])
-        actual_defense = self.defense * weather_effect["defense_multiplier"]
+        actual_defense = self.defense * combat.ENEMY_DEFENSE_MULTIPLIERS[weather.value]
         actual_damage = max(1, damage - actual_defense)
         self.hp -= actual_damage
         return actual_damage
@@ -772,99 +1711,54 @@ class Enemy:
         return self.hp > 0
     
     def get_attack_power(self, weather):
-        weather_effect = self.weather_effects.get(weather, self.weather_effects[Weather.CLEAR])
-        return self.attack * weather_effect["attack_multiplier"]
+        return self.attack * combat.ENEMY_ATTACK_MULTIPLIERS[weather.value]
 
 # Create enemies with more variety
 def create_enemies():
     enemies = []
     
     # Regular enemies
-    goblin = Enemy("Goblin", 1, 30, 8, 2, 25, 10, assets.goblin_img)
-    goblin.add_loot(Item("Rusty Dagger", "weapon", 3, 15, assets.sword_icon), 0.4)
-    goblin.add_loot(Item("Goblin Ear", "misc", 0, 5, assets.misc_icon), 0.8)
-    enemies.append(goblin)
-    
-    wolf = Enemy("Wild Wolf", 1, 40, 12, 1, 30, 15, assets.wolf_img)
-    wolf.add_loot(Item("Wolf Fang", "misc", 0, 10, assets.misc_icon), 0.7)
-    wolf.add_loot(Item("Wolf Pelt", "misc", 0, 20, assets.misc_icon), 0.5)
-    enemies.append(wolf)
-    
-    bandit = Enemy("Bandit", 2, 50, 15, 5, 45, 25, assets.bandit_img)
-    bandit.add_loot(Item("Short Sword", "weapon", 5, 30, assets.sword_icon), 0.3)
-    bandit.add_loot(Item("Leather Armor", "armor", 4, 40, assets.armor_icon), 0.2)
-    bandit.add_loot(Item("Small Health Potion", "potion", 20, 15, assets.potion_icon), 0.4)
-    enemies.append(bandit)
-    
-    orc = Enemy("Orc Warrior", 3, 80, 20, 8, 70, 40, assets.orc_img)
-    orc.add_loot(Item("Orcish Axe", "weapon", 8, 60, assets.sword_icon), 0.4)
-    orc.add_loot(Item("Orc Tusk", "misc", 0, 30, assets.misc_icon), 0.9)
-    orc.add_loot(Item("Medium Health Potion", "potion", 35, 25, assets.potion_icon), 0.3)
-    enemies.append(orc)
-    
-    skeleton = Enemy("Skeleton Warrior", 4, 60, 25, 10, 80, 50, assets.skeleton_img)
-    skeleton.add_loot(Item("Bone Fragments", "misc", 0, 20, assets.misc_icon), 0.8)
-    skeleton.add_loot(Item("Ancient Sword", "weapon", 10, 80, assets.sword_icon), 0.2)
-    enemies.append(skeleton)
-    
-    giant_spider = Enemy("Giant Spider", 5, 100, 18, 5, 90, 60, assets.spider_img)
-    giant_spider.add_loot(Item("Spider Silk", "material", 0, 40, assets.misc_icon), 0.7)
-    giant_spider.add_loot(Item("Spider Venom", "material", 0, 60, assets.misc_icon), 0.4)
-    enemies.append(giant_spider)
+    enemies.append(EnemyTemplate("Goblin", 1, 30, 8, 2, 25, 10, "goblin_img", loot_table=(
+        (item_catalog["rusty_dagger"], 0.4),
+        (item_catalog["goblin_ear"], 0.8)
+    )))
+    
+    enemies.append(EnemyTemplate("Wild Wolf", 1, 40, 12, 1, 30, 15, "wolf_img", loot_table=(
+        (item_catalog["wolf_fang"], 0.7),
+        (item_catalog["wolf_pelt"], 0.5)
+    )))
+    
+    enemies.append(EnemyTemplate("Bandit", 2, 50, 15, 5, 45, 25, "bandit_img", loot_table=(
+        (item_catalog["short_sword"], 0.3),
+        (item_catalog["leather_armor"], 0.2),
+        (item_catalog["small_health_potion"], 0.4)
+    )))
+    
+    enemies.append(EnemyTemplate("Orc Warrior", 3, 80, 20, 8, 70, 40, "orc_img", loot_table=(
+        (item_catalog["orcish_axe"], 0.4),
+        (item_catalog["orc_tusk"], 0.9),
+        (item_catalog["medium_health_potion"], 0.3)
+    )))
+    
+    enemies.append(EnemyTemplate("Skeleton Warrior", 4, 60, 25, 10, 80, 50, "skeleton_img", loot_table=(
+        (item_catalog["bone_fragments"], 0.8),
+        (item_catalog["ancient_sword"], 0.2)
+    )))
+    
+    enemies.append(EnemyTemplate("Giant Spider", 5, 100, 18, 5, 90, 60, "spider_img", loot_table=(
+        (item_catalog["spider_silk"], 0.7),
+        (item_catalog["spider_venom"], 0.4)
+    )))
     
     # Boss enemies
-    dragon = Enemy("Ancient Dragon", 10, 300, 40, 20, 500, 200, assets.dragon_img, True)
-    dragon.add_loot(Item("Dragon Scale Armor", "armor", 25, 300, assets.armor_icon), 1.0)
-    dragon.add_loot(Item("Dragonbone Sword", "weapon", 30, 400, assets.sword_icon), 1.0)
-    dragon.add_loot(Item("Large Health Potion", "potion", 60, 40, assets.potion_icon), 0.8)
-    enemies.append(dragon)
+    enemies.append(EnemyTemplate("Ancient Dragon", 10, 300, 40, 20, 500, 200, "dragon_img", True, (
+        (item_catalog["dragon_scale_armor"], 1.0),
+        (item_catalog["dragonbone_sword"], 1.0),
+        (item_catalog["large_health_potion"], 0.8)
+    )))
     
     return enemies
 
-# Create items with more variety and crafting materials
-def create_items():
-    items = []
-    
-    # Weapons
-    items.append(Item("Wooden Sword", "weapon", 2, 10, assets.sword_icon, "A basic wooden training sword"))
-    items.append(Item("Iron Sword", "weapon", 5, 30, assets.sword_icon, "A standard iron sword"))
-    items.append(Item("Steel Sword", "weapon", 8, 60, assets.sword_icon, "A well-made steel sword"))
-    items.append(Item("Silver Sword", "weapon", 12, 100, assets.sword_icon, "A sword made of silver, effective against undead"))
-    items.append(Item("Dragonbone Sword", "weapon", 30, 400, assets.sword_icon, "A powerful sword made from dragon bones"))
-    
-    # Armor
-    items.append(Item("Leather Vest", "armor", 3, 20, assets.armor_icon, "Simple leather armor offering minimal protection"))
-    items.append(Item("Chainmail", "armor", 7, 50, assets.armor_icon, "Flexible chainmail armor"))
-    items.append(Item("Plate Armor", "armor", 12, 100, assets.armor_icon, "Heavy plate armor offering excellent protection"))
-    items.append(Item("Silver Armor", "armor", 18, 200, assets.armor_icon, "Armor made of silver, effective against undead"))
-    items.append(Item("Dragon Scale Armor", "armor", 25, 300, assets.armor_icon, "Armor made from dragon scales"))
-    
-    # Potions
-    items.append(Item("Small Health Potion", "potion", 20, 15, assets.potion_icon, "Restores a small amount of health"))
-    items.append(Item("Medium Health Potion", "potion", 35, 25, assets.potion_icon, "Restores a moderate amount of health"))
-    items.append(Item("Large Health Potion", "potion", 60, 40, assets.potion_icon, "Restores a large amount of health"))
-    items.append(Item("Elixir of Life", "potion", 100, 100, assets.potion_icon, "Fully restores health"))
-    
-    # Materials
-    items.append(Item("Herbs", "material", 0, 5, assets.herb_icon, "Common herbs used in potion making"))
-    items.append(Item("Rare Herbs", "material", 0, 15, assets.herb_icon, "Rare herbs used in advanced potions"))
-    items.append(Item("Iron Ore", "material", 0, 10, assets.ore_icon, "Iron ore that can be smelted"))
-    items.append(Item("Silver Ore", "material", 0, 30, assets.ore_icon, "Silver ore that can be smelted"))
-    items.append(Item("Dragon Scales", "material", 0, 100, assets.misc_icon, "Rare scales from a dragon"))
-    items.append(Item("Spider Silk", "material", 0, 40, assets.misc_icon, "Strong silk from giant spiders"))
-    
-    # Recipes
-    items.append(Item("Health Potion Recipe", "recipe", 0, 50, assets.scroll_icon, 
-                     "Teaches how to craft health potions", True, {"Herbs": 3}))
-    items.append(Item("Iron Sword Recipe", "recipe", 0, 80, assets.scroll_icon, 
-                     "Teaches how to craft iron swords", True, {"Iron Ore": 2}))
-    
-    # Misc
-    items.append(Item("Ancient Key", "misc", 0, 0, assets.key_icon, "An ancient key to unlock hidden areas"))
-    items.append(Item("Treasure Map", "misc", 0, 50, assets.misc_icon, "A map leading to hidden treasure"))
-    
-    return items
-
 # Create quests
 def create_quests():
     quests = []
@@ -876,7 +1770,7 @@ def create_quests():
         "Defeat 5 Goblins",
         100,
         50,
-        [Item("Iron Sword", "weapon", 5, 30, assets.sword_icon)],
+        [item_catalog["iron_sword"]],
         None,
         {"Goblin": 5}
     )
@@ -889,7 +1783,7 @@ def create_quests():
         "Collect 10 Herbs",
         150,
         75,
-        [Item("Medium Health Potion", "potion", 35, 25, assets.potion_icon)],
+        [item_catalog["medium_health_potion"]],
         ("Herbs", 10)
     )
     quests.append(herb_quest)
@@ -902,8 +1796,8 @@ def create_quests():
         500,
         200,
         [
-            Item("Dragon Scale Armor", "armor", 25, 300, assets.armor_icon),
-            Item("Dragonbone Sword", "weapon", 30, 400, assets.sword_icon)
+            item_catalog["dragon_scale_armor"],
+            item_catalog["dragonbone_sword"]
         ],
         None,
         {"Ancient Dragon": 1}
@@ -919,13 +1813,13 @@ def create_crafting_recipes():
     # Potions
     recipes.append(CraftingRecipe(
         "Small Health Potion",
-        Item("Small Health Potion", "potion", 20, 15, assets.potion_icon),
+        item_catalog["small_health_potion"],
         {"Herbs": 3}
     ))
     
     recipes.append(CraftingRecipe(
         "Medium Health Potion",
-        Item("Medium Health Potion", "potion", 35, 25, assets.potion_icon),
+        item_catalog["medium_health_potion"],
         {"Rare Herbs": 2, "Herbs": 5},
         "Alchemy",
         2
@@ -934,7 +1828,7 @@ def create_crafting_recipes():
     # Weapons
     recipes.append(CraftingRecipe(
         "Iron Sword",
-        Item("Iron Sword", "weapon", 5, 30, assets.sword_icon),
+        item_catalog["iron_sword"],
         {"Iron Ore": 2},
         "Blacksmithing",
         1
@@ -942,7 +1836,7 @@ def create_crafting_recipes():
     
     recipes.append(CraftingRecipe(
         "Steel Sword",
-        Item("Steel Sword", "weapon", 8, 60, assets.sword_icon),
+        item_catalog["steel_sword"],
         {"Iron Ore": 5},
         "Blacksmithing",
         3
@@ -970,8 +1864,9 @@ class NPC:
         if self.is_quest_giver and self.quests:
             options.append("Quests")
         
-        selected_option = show_dialogue_options(self.name, self.dialogue, options)
-        
+        show_dialogue_options(self.name, self.dialogue, options, self.handle_option)
+    
+    def handle_option(self, selected_option):
         if selected_option == "Shop" and self.is_merchant:
             # Open shop with this NPC's items
             pass
@@ -985,25 +1880,58 @@ class NPC:
             return True
         return False
 
-# Dialogue system
-def show_dialogue(npc_name, text):
-    # Create a dialogue box
-    dialogue_box = pygame.Surface((800, 200), pygame.SRCALPHA)
-    dialogue_box.fill((0, 0, 0, 200))
-    pygame.draw.rect(dialogue_box, WHITE, (0, 0, 800, 200), 2)
+# Frame pacing. While something on screen animates, loops poll events and
+# tick at FPS as before; when the screen is static they block in
+# pygame.event.wait until input arrives or `timeout` ms pass, so idle
+# screens use no CPU
+IDLE_TIMEOUT = 1000
+
+def get_frame_events(animating=False, timeout=IDLE_TIMEOUT):
+    events = pygame.event.get()
+    if animating or events:
+        return events
+    event = pygame.event.wait(timeout)
+    events = pygame.event.get()
+    if event.type != pygame.NOEVENT:
+        events.insert(0, event)
+    return events
+
+# Base class for screens driven by the SceneManager. A scene reacts to
+# events, advances its own state once per frame and draws itself; the
+# manager owns the event pump, the display update and the clock
+class Scene:
+    state = GameState.PLAYING
+    
+    def __init__(self):
+        self.view = DirtyRegion()
+        self.animating = False  # Keep the loop ticking at FPS instead of idling
+    
+    def handle_event(self, event):
+        pass
+    
+    def update(self):
+        pass
+    
+    def get_widgets(self):
+        return []
     
-    # Draw NPC name
-    name_text = font_medium.render(npc_name, True, YELLOW)
-    dialogue_box.blit(name_text, (20, 20))
+    def draw(self, surface):
+        pass
+
+# Render a message popup surface
+def render_message(message):
+    popup = pygame.Surface((600, 100), pygame.SRCALPHA)
+    popup.fill((0, 0, 0, 200))
+    pygame.draw.rect(popup, WHITE, (0, 0, 600, 100), 2)
     
-    # Draw dialogue text (wrapped)
-    words = text.split(' ')
+    # Split message into multiple lines if needed
+    words = message.split(' ')
     lines = []
     current_line = ""
     
     for word in words:
         test_line = current_line + word + " "
-        if font_small.size(test_line)[0] < 760:
+        if font_medium.size(test_line)[0] < 580:
             current_line = test_line
         else:
             lines.append(current_line)
@@ -1012,416 +1940,641 @@ def show_dialogue(npc_name, text):
     if current_line:
         lines.append(current_line)
     
+    # Draw message lines
     for i, line in enumerate(lines):
-        line_text = font_small.render(line, True, WHITE)
-        dialogue_box.blit(line_text, (20, 60 + i * 30))
-    
-    # Draw to screen
-    screen.blit(dialogue_box, (SCREEN_WIDTH//2 - 400, SCREEN_HEIGHT - 220))
+        line_text = text_cache.render(font_medium, line, True, WHITE)
+        popup.blit(line_text, (300 - line_text.get_width()//2, 30 + i * 30))
     
-    # Draw continue prompt
-    continue_text = font_small.render("Press any key to continue...", True, WHITE)
-    screen.blit(continue_text, (SCREEN_WIDTH//2 - continue_text.get_width()//2, SCREEN_HEIGHT - 30))
+    return popup
+
+# Runs the game as a stack of scenes in a single loop: each frame has
+# exactly one event pump, one display update and one clock tick. Screens
+# that used to run their own loop are pushed on top of the current scene
+# and hand their result to an on_close callback when popped. Messages are
+# queued and shown one at a time over the top scene; while one is up it
+# swallows input and the scene below is frozen
+class SceneManager:
+    def __init__(self):
+        self.scenes = []  # (scene, on_close) pairs, top of the stack last
+        self.messages = []
+        self.popup = None
+        self.popup_end = 0
+        self.player = None
+        self.npcs = []
+        self.enemies = []
+        self.crafting_recipes = []
+        self.frame_stats = {}  # GameState -> [frames, seconds in update and draw]
+    
+    @property
+    def scene(self):
+        return self.scenes[-1][0]
+    
+    @property
+    def state(self):
+        return self.scene.state
+    
+    def push(self, scene, on_close=None):
+        self.scenes.append((scene, on_close))
+    
+    def pop(self, result=None):
+        scene, on_close = self.scenes.pop()
+        if self.scenes:
+            self.scene.view.invalidate()
+        if on_close:
+            on_close(result)
+    
+    def switch(self, scene):
+        # Replace the top scene, keeping its place in the stack
+        on_close = self.scenes.pop()[1] if self.scenes else None
+        self.scenes.append((scene, on_close))
+    
+    def show_message(self, message, duration=2):
+        self.messages.append((message, duration))
+    
+    def quit(self):
+        # Let pending autosaves reach the disk
+        save_worker.flush()
+        pygame.quit()
+        sys.exit()
+    
+    def handle_events(self):
+        if self.popup:
+            # The popup is static, so sleep until input arrives or it expires
+            timeout = max(1, self.popup_end - pygame.time.get_ticks())
+            for event in get_frame_events(timeout=timeout):
+                if event.type == pygame.QUIT:
+                    self.quit()
+            return
+        
+        for event in get_frame_events(self.scene.animating):
+            if event.type == pygame.QUIT:
+                self.quit()
+            
+            # A click may have swapped the scene, so look it up per event
+            self.scene.view.handle_event(event)
+            self.scene.handle_event(event)
+    
+    def update_popup(self):
+        now = pygame.time.get_ticks()
+        if self.popup and now >= self.popup_end:
+            self.popup = None
+            self.scene.view.invalidate()
+        
+        if not self.popup and self.messages:
+            message, duration = self.messages.pop(0)
+            self.popup = render_message(message)
+            self.popup_end = now + int(duration * 1000)
+            self.scene.view.invalidate()
+    
+    def step(self):
+        self.handle_events()
+        
+        start = time.perf_counter()
+        if not self.popup:
+            if self.player:
+                self.player.update()
+            self.scene.update()
+        self.update_popup()
+        
+        scene = self.scene
+        if scene.view.needs_redraw(scene.get_widgets()):
+            scene.view.begin(screen)
+            scene.draw(screen)
+            if self.popup and scene.view.full:
+                screen.blit(self.popup, (SCREEN_WIDTH//2 - 300, SCREEN_HEIGHT//2 - 50))
+            scene.view.present(screen)
+        
+        # Per-state frame timings for profiling
+        stats = self.frame_stats.setdefault(scene.state, [0, 0.0])
+        stats[0] += 1
+        stats[1] += time.perf_counter() - start
+        
+        clock.tick(FPS)
     
-    pygame.display.flip()
+    def run(self):
+        while self.scenes:
+            self.step()
+
+game = SceneManager()
+
+# Dialogue system. The box is drawn over a snapshot of the screen it was
+# opened from. Without options any key or click closes it; with options
+# the player picks one with UP/DOWN and Enter or a click, and the choice
+# is passed to the on_close callback
+class DialogueScene(Scene):
+    state = GameState.DIALOGUE
+    
+    def __init__(self, npc_name, text, options=None):
+        super().__init__()
+        self.npc_name = npc_name
+        self.text = text
+        self.options = options or []
+        self.selected_option = 0
+        self.backdrop = screen.copy()
     
-    # Wait for key press
-    waiting = True
-    while waiting:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+    def handle_event(self, event):
+        if not self.options:
             if event.type == pygame.KEYDOWN or event.type == pygame.MOUSEBUTTONDOWN:
-                waiting = False
-
-def show_dialogue_options(npc_name, text, options):
-    selected_option = 0
+                game.pop()
+            return
+        
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_UP:
+                self.selected_option = max(0, self.selected_option - 1)
+            elif event.key == pygame.K_DOWN:
+                self.selected_option = min(len(self.options) - 1, self.selected_option + 1)
+            elif event.key == pygame.K_RETURN:
+                game.pop(self.options[self.selected_option])
+        
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            option_y_start = SCREEN_HEIGHT - 220 - len(self.options) * 50 + 150
+            
+            for i in range(len(self.options)):
+                option_rect = pygame.Rect(SCREEN_WIDTH//2 - 400 + 50, option_y_start + i * 50,
+                                        700, 40)
+                if option_rect.collidepoint(event.pos):
+                    game.pop(self.options[i])
+                    return
+    
+    def draw(self, surface):
+        surface.blit(self.backdrop, (0, 0))
+        if self.options:
+            self.draw_options(surface)
+        else:
+            self.draw_text(surface)
+    
+    def draw_text(self, surface):
+        # Create a dialogue box
+        dialogue_box = pygame.Surface((800, 200), pygame.SRCALPHA)
+        dialogue_box.fill((0, 0, 0, 200))
+        pygame.draw.rect(dialogue_box, WHITE, (0, 0, 800, 200), 2)
+        
+        # Draw NPC name
+        name_text = text_cache.render(font_medium, self.npc_name, True, YELLOW)
+        dialogue_box.blit(name_text, (20, 20))
+        
+        # Draw dialogue text (wrapped)
+        words = self.text.split(' ')
+        lines = []
+        current_line = ""
+        
+        for word in words:
+            test_line = current_line + word + " "
+            if font_small.size(test_line)[0] < 760:
+                current_line = test_line
+            else:
+                lines.append(current_line)
+                current_line = word + " "
+        
+        if current_line:
+            lines.append(current_line)
+        
+        for i, line in enumerate(lines):
+            line_text = text_cache.render(font_small, line, True, WHITE)
+            dialogue_box.blit(line_text, (20, 60 + i * 30))
+        
+        # Draw to screen
+        surface.blit(dialogue_box, (SCREEN_WIDTH//2 - 400, SCREEN_HEIGHT - 220))
+        
+        # Draw continue prompt
+        continue_text = text_cache.render(font_small, "Press any key to continue...", True, WHITE)
+        surface.blit(continue_text, (SCREEN_WIDTH//2 - continue_text.get_width()//2, SCREEN_HEIGHT - 30))
     
-    while True:
+    def draw_options(self, surface):
+        options = self.options
+        
         # Create a dialogue box
         dialogue_box = pygame.Surface((800, 200 + len(options) * 50), pygame.SRCALPHA)
         dialogue_box.fill((0, 0, 0, 200))
         pygame.draw.rect(dialogue_box, WHITE, (0, 0, 800, 200 + len(options) * 50), 2)
         
         # Draw NPC name
-        name_text = font_medium.render(npc_name, True, YELLOW)
+        name_text = text_cache.render(font_medium, self.npc_name, True, YELLOW)
         dialogue_box.blit(name_text, (20, 20))
         
         # Draw dialogue text
-        dialogue_text = font_small.render(text, True, WHITE)
+        dialogue_text = text_cache.render(font_small, self.text, True, WHITE)
         dialogue_box.blit(dialogue_text, (20, 60))
         
         # Draw options
         for i, option in enumerate(options):
-            color = YELLOW if i == selected_option else WHITE
-            option_text = font_medium.render(option, True, color)
+            color = YELLOW if i == self.selected_option else WHITE
+            option_text = text_cache.render(font_medium, option, True, color)
             dialogue_box.blit(option_text, (50, 150 + i * 50))
         
         # Draw to screen
-        screen.blit(dialogue_box, (SCREEN_WIDTH//2 - 400, SCREEN_HEIGHT - 220 - len(options) * 50))
-        
-        pygame.display.flip()
-        
-        # Handle input
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_UP:
-                    selected_option = max(0, selected_option - 1)
-                elif event.key == pygame.K_DOWN:
-                    selected_option = min(len(options) - 1, selected_option + 1)
-                elif event.key == pygame.K_RETURN:
-                    return options[selected_option]
-            
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                mouse_pos = pygame.mouse.get_pos()
-                option_y_start = SCREEN_HEIGHT - 220 - len(options) * 50 + 150
-                
-                for i in range(len(options)):
-                    option_rect = pygame.Rect(SCREEN_WIDTH//2 - 400 + 50, option_y_start + i * 50, 
-                                            700, 40)
-                    if option_rect.collidepoint(mouse_pos):
-                        return options[i]
-
-# Weather effects
-def draw_weather_effect(weather):
-    if weather == Weather.RAIN:
-        # Create rain effect
-        rain_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        rain_surface.fill(RAIN_COLOR)
-        
-        # Draw rain drops
-        for _ in range(100):
-            x = random.randint(0, SCREEN_WIDTH)
-            y = random.randint(0, SCREEN_HEIGHT)
-            pygame.draw.line(rain_surface, (200, 200, 255), (x, y), (x - 10, y + 20), 1)
-        
-        screen.blit(rain_surface, (0, 0))
-        
-        # Play rain sound
-        if assets.rain_sound and not mixer.Channel(1).get_busy():
-            mixer.Channel(1).play(assets.rain_sound, loops=-1)
-    
-    elif weather == Weather.SNOW:
-        # Create snow effect
-        snow_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        snow_surface.fill(SNOW_COLOR)
-        
-        # Draw snow flakes
-        for _ in range(50):
-            x = random.randint(0, SCREEN_WIDTH)
-            y = random.randint(0, SCREEN_HEIGHT)
-            pygame.draw.circle(snow_surface, WHITE, (x, y), random.randint(1, 3))
-        
-        screen.blit(snow_surface, (0, 0))
-        
-        # Play snow sound
-        if assets.snow_sound and not mixer.Channel(1).get_busy():
-            mixer.Channel(1).play(assets.snow_sound, loops=-1)
-    
-    elif weather == Weather.SANDSTORM:
-        # Create sandstorm effect
-        sand_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        sand_surface.fill(SANDSTORM_COLOR)
-        
-        # Draw sand particles
-        for _ in range(150):
-            x = random.randint(0, SCREEN_WIDTH)
-            y = random.randint(0, SCREEN_HEIGHT)
-            pygame.draw.circle(sand_surface, (210, 180, 140), (x, y), random.randint(1, 2))
-        
-        screen.blit(sand_surface, (0, 0))
-        
-        # Play wind sound
-        if assets.wind_sound and not mixer.Channel(1).get_busy():
-            mixer.Channel(1).play(assets.wind_sound, loops=-1)
-    
-    else:
-        # Clear weather - stop any weather sounds
-        mixer.Channel(1).stop()
+        surface.blit(dialogue_box, (SCREEN_WIDTH//2 - 400, SCREEN_HEIGHT - 220 - len(options) * 50))
 
-# Time of day effects
-def draw_time_effect(time_of_day):
-    time_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-    
-    if time_of_day == TimeOfDay.DAWN:
-        time_surface.fill((255, 200, 150, 50))
-    elif time_of_day == TimeOfDay.DUSK:
-        time_surface.fill((100, 50, 150, 70))
-    elif time_of_day == TimeOfDay.NIGHT:
-        time_surface.fill((0, 0, 100, 120))
-    
-    if time_of_day != TimeOfDay.DAY:
-        screen.blit(time_surface, (0, 0))
+def show_dialogue(npc_name, text):
+    game.push(DialogueScene(npc_name, text))
+
+def show_dialogue_options(npc_name, text, options, on_choice=None):
+    game.push(DialogueScene(npc_name, text, options), on_choice)
+
+# Overlay tint for each time of day
+TIME_TINTS = {
+    TimeOfDay.DAWN: (255, 200, 150, 50),
+    TimeOfDay.DAY: (0, 0, 0, 0),
+    TimeOfDay.DUSK: (100, 50, 150, 70),
+    TimeOfDay.NIGHT: (0, 0, 100, 120),
+}
+NO_TINT = (0, 0, 0, 0)
+TIME_TRANSITION = 15  # seconds spent fading into the next time of day
+TINT_TRANSITION_STEPS = 8  # distinct overlays generated per fade
+OVERLAY_CACHE_SIZE = 6
+
+def blend_tint(start, end, amount):
+    # A fully transparent tint has no colour of its own, so borrow the other one
+    if start[3] == 0:
+        start = end[:3] + (0,)
+    if end[3] == 0:
+        end = start[:3] + (0,)
+    return tuple(round(a + (b - a) * amount) for a, b in zip(start, end))
+
+def composite_tint(under, over):
+    # Single tint equivalent to blitting `under` and then `over`
+    under_alpha = under[3] / 255
+    over_alpha = over[3] / 255
+    alpha = over_alpha + under_alpha * (1 - over_alpha)
+    if alpha == 0:
+        return NO_TINT
+    color = tuple(round((o * over_alpha + u * under_alpha * (1 - over_alpha)) / alpha)
+                  for u, o in zip(under[:3], over[:3]))
+    return color + (round(alpha * 255),)
+
+def tint_color(color, tint):
+    # Opaque colour as it looks under a tint overlay
+    alpha = tint[3] / 255
+    return tuple(round(c + (t - c) * alpha) for c, t in zip(color[:3], tint[:3]))
+
+def get_time_tint(time_of_day, blend=0.0):
+    if blend <= 0:
+        return TIME_TINTS[time_of_day]
+    next_time = TimeOfDay((time_of_day.value + 1) % len(TimeOfDay))
+    # Quantize the fade so only a handful of overlays are ever built
+    step = int(blend * TINT_TRANSITION_STEPS) / TINT_TRANSITION_STEPS
+    return blend_tint(TIME_TINTS[time_of_day], TIME_TINTS[next_time], step)
+
+# Full-screen tint overlays keyed by RGBA, most recently used last
+class TintOverlayCache:
+    def __init__(self, size=OVERLAY_CACHE_SIZE):
+        self.size = size
+        self.overlays = OrderedDict()
+    
+    def get(self, tint):
+        if tint[3] == 0:
+            return None
+        if tint in self.overlays:
+            self.overlays.move_to_end(tint)
+            return self.overlays[tint]
+        
+        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        overlay.fill(tint)
+        self.overlays[tint] = overlay
+        if len(self.overlays) > self.size:
+            self.overlays.popitem(last=False)
+        return overlay
+
+tint_overlays = TintOverlayCache()
+
+# Particle settings per weather: particle budget, overlay tint, particle
+# colour and size range, and per-tick velocity range
+WEATHER_PARTICLES = {
+    Weather.RAIN: {"count": 100, "tint": RAIN_COLOR, "color": (200, 200, 255),
+                   "size": (1, 1), "vx": (-5, -4), "vy": (10, 12)},
+    Weather.SNOW: {"count": 50, "tint": SNOW_COLOR, "color": WHITE,
+                   "size": (1, 3), "vx": (-0.5, 0.5), "vy": (1, 2)},
+    Weather.SANDSTORM: {"count": 150, "tint": SANDSTORM_COLOR, "color": (210, 180, 140),
+                        "size": (1, 2), "vx": (8, 14), "vy": (-1, 1)},
+}
+
+# Weather particles that persist between frames. Positions and velocities
+# live in flat arrays and are advanced each tick; particles are drawn
+# straight onto the target surface over a cached tint overlay
+class WeatherSystem:
+    def __init__(self, budgets=None):
+        self.budgets = budgets or {}  # Weather -> particle count override
+        self.weather = Weather.CLEAR
+        self.count = 0
+        self.xs = array('f')
+        self.ys = array('f')
+        self.vxs = array('f')
+        self.vys = array('f')
+        self.sizes = array('B')
+    
+    def set_weather(self, weather):
+        if weather == self.weather:
+            return
+        self.weather = weather
+        settings = WEATHER_PARTICLES.get(weather)
+        if not settings:
+            self.count = 0
+            return
+        
+        count = self.budgets.get(weather, settings["count"])
+        self.xs = array('f', (random.uniform(0, SCREEN_WIDTH) for _ in range(count)))
+        self.ys = array('f', (random.uniform(0, SCREEN_HEIGHT) for _ in range(count)))
+        self.vxs = array('f', (random.uniform(*settings["vx"]) for _ in range(count)))
+        self.vys = array('f', (random.uniform(*settings["vy"]) for _ in range(count)))
+        self.sizes = array('B', (random.randint(*settings["size"]) for _ in range(count)))
+        self.count = count
+    
+    def update(self):
+        xs, ys, vxs, vys = self.xs, self.ys, self.vxs, self.vys
+        for i in range(self.count):
+            xs[i] = (xs[i] + vxs[i]) % SCREEN_WIDTH
+            ys[i] = (ys[i] + vys[i]) % SCREEN_HEIGHT
+    
+    def draw(self, surface, time_tint=NO_TINT):
+        # The weather tint and the time-of-day tint are merged into one
+        # overlay, and particles are pre-tinted so they still darken at night
+        settings = WEATHER_PARTICLES.get(self.weather)
+        weather_tint = settings["tint"] if settings else NO_TINT
+        overlay = tint_overlays.get(composite_tint(weather_tint, time_tint))
+        if overlay:
+            surface.blit(overlay, (0, 0))
+        if not self.count:
+            return
+        
+        color = tint_color(settings["color"], time_tint)
+        if self.weather == Weather.RAIN:
+            for x, y in zip(self.xs, self.ys):
+                pygame.draw.line(surface, color, (x, y), (x - 10, y + 20), 1)
+        else:
+            for x, y, size in zip(self.xs, self.ys, self.sizes):
+                pygame.draw.circle(surface, color, (x, y), size)
+
+weather_system = WeatherSystem()
 
 # Mini-game: Fishing
-def fishing_minigame(player):
-    result = None
-    progress = 0
-    fish_rect = pygame.Rect(SCREEN_WIDTH//2 - 25, 400, 50, 20)
-    catch_zone = pygame.Rect(SCREEN_WIDTH//2 - 100, 300, 200, 100)
-    fish_speed = 3
-    direction = 1  # 1 for right, -1 for left
-    
-    # Create buttons
-    cast_btn = Button(SCREEN_WIDTH//2 - 100, 600, 200, 50, "Cast Line")
-    back_btn = Button(50, 50, 100, 50, "Back")
-    
-    while result is None:
-        mouse_pos = pygame.mouse.get_pos()
-        
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-                
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if cast_btn.is_clicked(mouse_pos, event) and progress == 0:
-                    progress = 1  # Fishing in progress
-                    cast_btn.text = "Reel In!"
-                elif cast_btn.is_clicked(mouse_pos, event) and progress == 1:
-                    # Check if fish is in catch zone
-                    if catch_zone.contains(fish_rect):
-                        # Successful catch
-                        fish_type = random.choice(["Small Fish", "Medium Fish", "Large Fish", "Rare Fish"])
-                        gold_earned = random.randint(10, 50)
-                        player.gold += gold_earned
-                        show_message(f"Caught a {fish_type}! Earned {gold_earned} gold!")
-                    else:
-                        show_message("The fish got away!")
-                    
-                    progress = 0
-                    cast_btn.text = "Cast Line"
-                    fish_rect.x = SCREEN_WIDTH//2 - 25
+class FishingScene(Scene):
+    state = GameState.MINIGAME
+    
+    def __init__(self, player):
+        super().__init__()
+        self.player = player
+        self.progress = 0
+        self.fish_rect = pygame.Rect(SCREEN_WIDTH//2 - 25, 400, 50, 20)
+        self.catch_zone = pygame.Rect(SCREEN_WIDTH//2 - 100, 300, 200, 100)
+        self.fish_speed = 3
+        self.direction = 1  # 1 for right, -1 for left
+        
+        # Create buttons
+        self.cast_btn = Button(SCREEN_WIDTH//2 - 100, 600, 200, 50, "Cast Line")
+        self.back_btn = Button(50, 50, 100, 50, "Back")
+    
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if self.cast_btn.is_clicked(event.pos, event) and self.progress == 0:
+                self.progress = 1  # Fishing in progress
+                self.cast_btn.text = "Reel In!"
+            elif self.cast_btn.is_clicked(event.pos, event) and self.progress == 1:
+                # Check if fish is in catch zone
+                if self.catch_zone.contains(self.fish_rect):
+                    # Successful catch
+                    fish_type = game_rng.world.choice(["Small Fish", "Medium Fish", "Large Fish", "Rare Fish"])
+                    gold_earned = game_rng.world.randint(10, 50)
+                    self.player.gold += gold_earned
+                    show_message(f"Caught a {fish_type}! Earned {gold_earned} gold!")
+                else:
+                    show_message("The fish got away!")
                 
-                if back_btn.is_clicked(mouse_pos, event):
-                    return
-        
+                self.progress = 0
+                self.cast_btn.text = "Cast Line"
+                self.fish_rect.x = SCREEN_WIDTH//2 - 25
+            
+            if self.back_btn.is_clicked(event.pos, event):
+                game.pop()
+    
+    def update(self):
         # Update fishing progress
-        if progress == 1:
+        self.animating = self.progress == 1
+        if self.progress == 1:
             # Move fish
-            fish_rect.x += fish_speed * direction
+            self.fish_rect.x += self.fish_speed * self.direction
             
             # Change direction if at edge
-            if fish_rect.right > SCREEN_WIDTH:
-                direction = -1
-            elif fish_rect.left < 0:
-                direction = 1
+            if self.fish_rect.right > SCREEN_WIDTH:
+                self.direction = -1
+            elif self.fish_rect.left < 0:
+                self.direction = 1
             
             # Randomly change speed
-            if random.random() < 0.02:
-                fish_speed = random.randint(2, 5)
-        
+            if game_rng.world.random() < 0.02:
+                self.fish_speed = game_rng.world.randint(2, 5)
+            
+            self.view.invalidate()
+    
+    def draw(self, surface):
         # Draw fishing screen
-        screen.fill(BLUE)
+        surface.fill(BLUE)
         
         # Draw water
-        pygame.draw.rect(screen, (0, 100, 200), (0, SCREEN_HEIGHT//2, SCREEN_WIDTH, SCREEN_HEIGHT//2))
+        pygame.draw.rect(surface, (0, 100, 200), (0, SCREEN_HEIGHT//2, SCREEN_WIDTH, SCREEN_HEIGHT//2))
         
         # Draw fishing interface
-        pygame.draw.rect(screen, GRAY, (SCREEN_WIDTH//2 - 150, 200, 300, 300), 2)
-        pygame.draw.rect(screen, (0, 0, 0, 50), catch_zone)
+        pygame.draw.rect(surface, GRAY, (SCREEN_WIDTH//2 - 150, 200, 300, 300), 2)
+        pygame.draw.rect(surface, (0, 0, 0, 50), self.catch_zone)
         
         # Draw fish
-        pygame.draw.ellipse(screen, ORANGE, fish_rect)
+        pygame.draw.ellipse(surface, ORANGE, self.fish_rect)
         
         # Draw buttons
-        if progress == 0:
-            cast_btn.draw(screen)
+        if self.progress == 0:
+            self.cast_btn.draw(surface)
         else:
             # Draw reel button only when fish is in catch zone
-            if catch_zone.contains(fish_rect):
-                cast_btn.color = GREEN
-                cast_btn.hover_color = YELLOW
-                cast_btn.draw(screen)
+            if self.catch_zone.contains(self.fish_rect):
+                self.cast_btn.color = GREEN
+                self.cast_btn.hover_color = YELLOW
+                self.cast_btn.draw(surface)
             else:
-                cast_btn.color = RED
-                cast_btn.hover_color = ORANGE
-                cast_btn.draw(screen)
+                self.cast_btn.color = RED
+                self.cast_btn.hover_color = ORANGE
+                self.cast_btn.draw(surface)
         
-        back_btn.draw(screen)
+        self.back_btn.draw(surface)
         
         # Draw instructions
-        if progress == 0:
-            instr_text = font_medium.render("Cast your line to start fishing!", True, WHITE)
+        if self.progress == 0:
+            instr_text = text_cache.render(font_medium, "Cast your line to start fishing!", True, WHITE)
         else:
-            instr_text = font_medium.render("Reel in when the fish is in the dark area!", True, WHITE)
-        
-        screen.blit(instr_text, (SCREEN_WIDTH//2 - instr_text.get_width()//2, 150))
+            instr_text = text_cache.render(font_medium, "Reel in when the fish is in the dark area!", True, WHITE)
         
-        pygame.display.flip()
-        clock.tick(FPS)
+        surface.blit(instr_text, (SCREEN_WIDTH//2 - instr_text.get_width()//2, 150))
 
 # Mini-game: Lockpicking
-def lockpicking_minigame(player):
-    result = None
-    difficulty = min(max(player.level // 2, 1), 10)  # Scale with player level
-    pick_position = 0
-    tension = 0
-    lock_positions = [random.randint(10, 90) for _ in range(difficulty)]
-    current_lock = 0
-    pick_speed = 2
-    
-    # Create buttons
-    back_btn = Button(50, 50, 100, 50, "Back")
-    
-    while result is None:
-        mouse_pos = pygame.mouse.get_pos()
-        
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-                
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE:
-                    # Apply tension
-                    tension = 1
-                    
-                    # Check if pick is in correct position
-                    if abs(pick_position - lock_positions[current_lock]) < 5:
-                        current_lock += 1
-                        if current_lock >= len(lock_positions):
-                            # Lock opened
-                            gold_earned = random.randint(20, 100)
-                            player.gold += gold_earned
-                            show_message(f"Lock picked! Found {gold_earned} gold!")
-                            return
-                    else:
-                        # Failed - reset progress
-                        current_lock = 0
+class LockpickingScene(Scene):
+    state = GameState.MINIGAME
+    
+    def __init__(self, player):
+        super().__init__()
+        self.player = player
+        self.difficulty = min(max(player.level // 2, 1), 10)  # Scale with player level
+        self.pick_position = 0
+        self.tension = 0
+        self.lock_positions = [game_rng.world.randint(10, 90) for _ in range(self.difficulty)]
+        self.current_lock = 0
+        self.pick_speed = 2
+        
+        # Create buttons
+        self.back_btn = Button(50, 50, 100, 50, "Back")
+    
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_SPACE:
+                # Apply tension
+                self.tension = 1
                 
-            if event.type == pygame.KEYUP:
-                if event.key == pygame.K_SPACE:
-                    tension = 0
-            
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if back_btn.is_clicked(mouse_pos, event):
-                    return
+                # Check if pick is in correct position
+                if abs(self.pick_position - self.lock_positions[self.current_lock]) < 5:
+                    self.current_lock += 1
+                    if self.current_lock >= len(self.lock_positions):
+                        # Lock opened
+                        gold_earned = game_rng.world.randint(20, 100)
+                        self.player.gold += gold_earned
+                        show_message(f"Lock picked! Found {gold_earned} gold!")
+                        game.pop()
+                else:
+                    # Failed - reset progress
+                    self.current_lock = 0
         
+        if event.type == pygame.KEYUP:
+            if event.key == pygame.K_SPACE:
+                self.tension = 0
+        
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if self.back_btn.is_clicked(event.pos, event):
+                game.pop()
+    
+    def update(self):
         # Move pick with arrow keys
         keys = pygame.key.get_pressed()
+        self.animating = keys[pygame.K_LEFT] or keys[pygame.K_RIGHT]
         if keys[pygame.K_LEFT]:
-            pick_position = max(0, pick_position - pick_speed)
+            self.pick_position = max(0, self.pick_position - self.pick_speed)
         if keys[pygame.K_RIGHT]:
-            pick_position = min(100, pick_position + pick_speed)
-        
+            self.pick_position = min(100, self.pick_position + self.pick_speed)
+        if self.animating:
+            self.view.invalidate()
+    
+    def draw(self, surface):
         # Draw lockpicking screen
-        screen.fill(BLACK)
+        surface.fill(BLACK)
         
         # Draw lock
-        pygame.draw.rect(screen, GRAY, (SCREEN_WIDTH//2 - 150, 200, 300, 100), 2)
+        pygame.draw.rect(surface, GRAY, (SCREEN_WIDTH//2 - 150, 200, 300, 100), 2)
         
         # Draw pins
-        for i in range(difficulty):
-            pin_height = 30 if i >= current_lock else 10
-            pygame.draw.rect(screen, GOLD, 
-                            (SCREEN_WIDTH//2 - 120 + i * (240 // difficulty), 
-                             200, 
-                             10, 
+        for i in range(self.difficulty):
+            pin_height = 30 if i >= self.current_lock else 10
+            pygame.draw.rect(surface, GOLD,
+                            (SCREEN_WIDTH//2 - 120 + i * (240 // self.difficulty),
+                             200,
+                             10,
                              pin_height))
         
         # Draw pick
-        pick_x = SCREEN_WIDTH//2 - 120 + pick_position * 2.4
-        pygame.draw.polygon(screen, SILVER, 
+        pick_x = SCREEN_WIDTH//2 - 120 + self.pick_position * 2.4
+        pygame.draw.polygon(surface, SILVER,
                            [(pick_x, 350), (pick_x - 10, 370), (pick_x + 10, 370)])
         
         # Draw tension wrench
-        if tension:
-            pygame.draw.rect(screen, SILVER, (SCREEN_WIDTH//2 - 10, 340, 20, 10))
+        if self.tension:
+            pygame.draw.rect(surface, SILVER, (SCREEN_WIDTH//2 - 10, 340, 20, 10))
         
         # Draw instructions
-        instr_text = font_medium.render("Use LEFT/RIGHT to move pick, SPACE to apply tension", True, WHITE)
-        screen.blit(instr_text, (SCREEN_WIDTH//2 - instr_text.get_width()//2, 400))
-        
-        diff_text = font_small.render(f"Difficulty: {difficulty}/10", True, WHITE)
-        screen.blit(diff_text, (SCREEN_WIDTH//2 - diff_text.get_width()//2, 450))
+        instr_text = text_cache.render(font_medium, "Use LEFT/RIGHT to move pick, SPACE to apply tension", True, WHITE)
+        surface.blit(instr_text, (SCREEN_WIDTH//2 - instr_text.get_width()//2, 400))
         
-        back_btn.draw(screen)
+        diff_text = text_cache.render(font_small, f"Difficulty: {self.difficulty}/10", True, WHITE)
+        surface.blit(diff_text, (SCREEN_WIDTH//2 - diff_text.get_width()//2, 450))
         
-        pygame.display.flip()
-        clock.tick(FPS)
+        self.back_btn.draw(surface)
 
 # Crafting screen
-def crafting_screen(player, recipes):
-    selected_recipe = None
-    can_craft = False
+class CraftingScene(Scene):
+    state = GameState.CRAFTING
+    
+    def __init__(self, player, recipes):
+        super().__init__()
+        self.player = player
+        self.recipes = recipes
+        self.selected_recipe = None
+        self.crafting = CraftingTracker(player, recipes)
+        
+        # Create buttons
+        self.craft_btn = Button(700, 600, 150, 50, "Craft")
+        self.back_btn = Button(850, 600, 150, 50, "Back")
+        
+        # Recipe grid
+        self.cells = [ItemCell(recipe.result_item, 50 + (i % 5) * 110, 150 + (i // 5) * 110)
+                      for i, recipe in enumerate(recipes)]
+    
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            player = self.player
+            mouse_pos = event.pos
+            
+            # Check recipe selection
+            for i, recipe in enumerate(self.recipes):
+                col = i % 5
+                row = i // 5
+                item_rect = pygame.Rect(50 + col * 110, 150 + row * 110, 100, 100)
+                if item_rect.collidepoint(mouse_pos):
+                    self.selected_recipe = recipe
+            
+            # Check button clicks
+            if self.back_btn.is_clicked(mouse_pos, event):
+                self.crafting.close()
+                game.pop()
+                return
+            
+            selected_recipe = self.selected_recipe
+            if selected_recipe and self.craft_btn.is_clicked(mouse_pos, event) and self.can_craft:
+                selected_recipe.craft(player)
+                
+                if assets.crafting_sound:
+                    assets.crafting_sound.play()
+                
+                show_message(f"Crafted {selected_recipe.result_item.name}!")
+                self.selected_recipe = None
     
-    # Create buttons
-    craft_btn = Button(700, 600, 150, 50, "Craft")
-    back_btn = Button(850, 600, 150, 50, "Back")
+    @property
+    def can_craft(self):
+        return self.selected_recipe is not None and self.crafting.can_craft(self.selected_recipe)
     
-    while True:
+    def update(self):
         mouse_pos = pygame.mouse.get_pos()
         
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-                
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                # Check recipe selection
-                for i, recipe in enumerate(recipes):
-                    col = i % 5
-                    row = i // 5
-                    item_rect = pygame.Rect(50 + col * 110, 150 + row * 110, 100, 100)
-                    if item_rect.collidepoint(mouse_pos):
-                        selected_recipe = recipe
-                        can_craft = recipe.can_craft(player.inventory, player.skills)
-                
-                # Check button clicks
-                if back_btn.is_clicked(mouse_pos, event):
-                    return
-                
-                if selected_recipe and craft_btn.is_clicked(mouse_pos, event) and can_craft:
-                    # Remove materials
-                    for mat_name, quantity in selected_recipe.materials_required.items():
-                        for _ in range(quantity):
-                            item_to_remove = next((i for i in player.inventory if i.name == mat_name), None)
-                            if item_to_remove:
-                                player.inventory.remove(item_to_remove)
-                    
-                    # Add crafted item
-                    player.add_item(selected_recipe.result_item)
-                    
-                    if assets.crafting_sound:
-                        assets.crafting_sound.play()
-                    
-                    show_message(f"Crafted {selected_recipe.result_item.name}!")
-                    selected_recipe = None
-        
         # Update button hover states
-        back_btn.check_hover(mouse_pos)
-        if selected_recipe and can_craft:
-            craft_btn.check_hover(mouse_pos)
+        self.back_btn.check_hover(mouse_pos)
+        if self.selected_recipe and self.can_craft:
+            self.craft_btn.check_hover(mouse_pos)
         
-        # Draw crafting screen
-        screen.fill(BLACK)
+        # Update recipe cells
+        for recipe, cell in zip(self.recipes, self.cells):
+            cell.selected = self.selected_recipe == recipe
+            cell.unavailable = not self.crafting.can_craft(recipe)
+    
+    def get_widgets(self):
+        craft = [self.craft_btn] if self.selected_recipe and self.can_craft else []
+        return [self.back_btn] + craft + self.cells
+    
+    def draw(self, surface):
+        selected_recipe = self.selected_recipe
         
+        # Draw crafting screen
         # Draw background
-        screen.blit(assets.town_bg, (0, 0))
+        surface.blit(assets.town_bg, (0, 0))
         
         # Draw title
-        title_text = font_large.render("Crafting", True, WHITE)
-        screen.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, 50))
+        title_text = text_cache.render(font_large, "Crafting", True, WHITE)
+        surface.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, 50))
         
         # Draw recipes
-        for i, recipe in enumerate(recipes):
-            col = i % 5
-            row = i // 5
-            x = 50 + col * 110
-            y = 150 + row * 110
-            
-            # Draw recipe result icon
-            recipe.result_item.draw(screen, x, y, selected_recipe == recipe)
-            
-            # Draw indicator if can't craft
-            if not recipe.can_craft(player.inventory, player.skills):
-                pygame.draw.rect(screen, (255, 0, 0, 100), (x, y, 100, 100))
+        for cell in self.cells:
+            cell.draw(surface)
         
         # Draw selected recipe info
         if selected_recipe:
@@ -1439,73 +2592,85 @@ def crafting_screen(player, recipes):
             if selected_recipe.skill_required:
                 info_text.append(f"Requires: {selected_recipe.skill_required} (Level {selected_recipe.skill_level})")
             
+            info_text.extend(self.crafting.status(selected_recipe))
+            
             # Draw info
             for i, text in enumerate(info_text):
-                text_surf = font_small.render(text, True, WHITE)
-                screen.blit(text_surf, (700, 150 + i * 25))
+                text_surf = text_cache.render(font_small, text, True, WHITE)
+                surface.blit(text_surf, (700, 150 + i * 25))
             
             # Draw craft button if possible
-            if can_craft:
-                craft_btn.draw(screen)
+            if self.can_craft:
+                self.craft_btn.draw(surface)
         
-        back_btn.draw(screen)
-        
-        pygame.display.flip()
-        clock.tick(FPS)
+        self.back_btn.draw(surface)
 
 # Skills screen
-def skills_screen(player):
-    selected_skill = None
+class SkillsScene(Scene):
+    state = GameState.SKILLS
     
-    # Create buttons
-    upgrade_btn = Button(700, 600, 150, 50, "Upgrade")
-    back_btn = Button(850, 600, 150, 50, "Back")
+    def __init__(self, player):
+        super().__init__()
+        self.player = player
+        self.selected_skill = None
+        
+        # Create buttons
+        self.upgrade_btn = Button(700, 600, 150, 50, "Upgrade")
+        self.back_btn = Button(850, 600, 150, 50, "Back")
+    
+    def can_upgrade_selected(self):
+        return self.selected_skill and self.selected_skill.can_upgrade(self.player.level)
+    
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            mouse_pos = event.pos
+            
+            # Check skill selection
+            for i, skill in enumerate(self.player.skills):
+                col = i % 3
+                row = i // 3
+                skill_rect = pygame.Rect(50 + col * 300, 150 + row * 100, 280, 80)
+                if skill_rect.collidepoint(mouse_pos):
+                    self.selected_skill = skill
+            
+            # Check button clicks
+            if self.back_btn.is_clicked(mouse_pos, event):
+                game.pop()
+                return
+            
+            selected_skill = self.selected_skill
+            if selected_skill and self.upgrade_btn.is_clicked(mouse_pos, event):
+                if self.player.upgrade_skill(selected_skill.name):
+                    show_message(f"{selected_skill.name} upgraded to level {selected_skill.current_level}!")
+                else:
+                    show_message("Cannot upgrade this skill!")
     
-    while True:
+    def update(self):
         mouse_pos = pygame.mouse.get_pos()
         
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-                
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                # Check skill selection
-                for i, skill in enumerate(player.skills):
-                    col = i % 3
-                    row = i // 3
-                    skill_rect = pygame.Rect(50 + col * 300, 150 + row * 100, 280, 80)
-                    if skill_rect.collidepoint(mouse_pos):
-                        selected_skill = skill
-                
-                # Check button clicks
-                if back_btn.is_clicked(mouse_pos, event):
-                    return
-                
-                if selected_skill and upgrade_btn.is_clicked(mouse_pos, event):
-                    if player.upgrade_skill(selected_skill.name):
-                        show_message(f"{selected_skill.name} upgraded to level {selected_skill.current_level}!")
-                    else:
-                        show_message("Cannot upgrade this skill!")
-        
         # Update button hover states
-        back_btn.check_hover(mouse_pos)
-        if selected_skill and selected_skill.can_upgrade(player.level):
-            upgrade_btn.check_hover(mouse_pos)
+        self.back_btn.check_hover(mouse_pos)
+        if self.can_upgrade_selected():
+            self.upgrade_btn.check_hover(mouse_pos)
+    
+    def get_widgets(self):
+        return [self.back_btn] + ([self.upgrade_btn] if self.can_upgrade_selected() else [])
+    
+    def draw(self, surface):
+        player = self.player
+        selected_skill = self.selected_skill
         
         # Draw skills screen
-        screen.fill(BLACK)
-        
         # Draw background
-        screen.blit(assets.town_bg, (0, 0))
+        surface.blit(assets.town_bg, (0, 0))
         
         # Draw title
-        title_text = font_large.render("Skills", True, WHITE)
-        screen.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, 50))
+        title_text = text_cache.render(font_large, "Skills", True, WHITE)
+        surface.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, 50))
         
         # Draw skill points
-        points_text = font_medium.render(f"Available Skill Points: {player.level - sum(s.current_level for s in player.skills)}", True, WHITE)
-        screen.blit(points_text, (50, 100))
+        points_text = text_cache.render(font_medium, f"Available Skill Points: {player.level - sum(s.current_level for s in player.skills)}", True, WHITE)
+        surface.blit(points_text, (50, 100))
         
         # Draw skills
         for i, skill in enumerate(player.skills):
@@ -1516,21 +2681,21 @@ def skills_screen(player):
             
             # Draw skill box
             color = YELLOW if selected_skill == skill else BLUE
-            pygame.draw.rect(screen, color, (x, y, 280, 80), border_radius=5)
-            pygame.draw.rect(screen, BLACK, (x, y, 280, 80), 2, border_radius=5)
+            pygame.draw.rect(surface, color, (x, y, 280, 80), border_radius=5)
+            pygame.draw.rect(surface, BLACK, (x, y, 280, 80), 2, border_radius=5)
             
             # Draw skill name and level
-            name_text = font_medium.render(f"{skill.name} (Lvl {skill.current_level}/{skill.max_level})", True, BLACK)
-            screen.blit(name_text, (x + 10, y + 10))
+            name_text = text_cache.render(font_medium, f"{skill.name} (Lvl {skill.current_level}/{skill.max_level})", True, BLACK)
+            surface.blit(name_text, (x + 10, y + 10))
             
             # Draw skill description
-            desc_text = font_small.render(skill.description, True, BLACK)
-            screen.blit(desc_text, (x + 10, y + 35))
+            desc_text = text_cache.render(font_small, skill.description, True, BLACK)
+            surface.blit(desc_text, (x + 10, y + 35))
             
             # Draw requirements if not unlocked
             if not skill.can_upgrade(player.level):
-                req_text = font_small.render(f"Req: Lvl {skill.required_level}", True, RED)
-                screen.blit(req_text, (x + 10, y + 55))
+                req_text = text_cache.render(font_small, f"Req: Lvl {skill.required_level}", True, RED)
+                surface.blit(req_text, (x + 10, y + 55))
         
         # Draw selected skill info
         if selected_skill:
@@ -1553,105 +2718,143 @@ def skills_screen(player):
             
             # Draw info
             for i, text in enumerate(info_text):
-                text_surf = font_small.render(text, True, WHITE)
-                screen.blit(text_surf, (700, 150 + i * 25))
+                text_surf = text_cache.render(font_small, text, True, WHITE)
+                surface.blit(text_surf, (700, 150 + i * 25))
             
             # Draw upgrade button if possible
             if selected_skill.can_upgrade(player.level):
-                upgrade_btn.draw(screen)
+                self.upgrade_btn.draw(surface)
         
-        back_btn.draw(screen)
-        
-        pygame.display.flip()
-        clock.tick(FPS)
+        self.back_btn.draw(surface)
 
 # Quest screen
-def quest_screen(player):
-    selected_quest = None
-    show_active = True  # Toggle between active and available quests
-    
-    # Create buttons
-    toggle_btn = Button(50, 100, 200, 50, "Show Available" if show_active else "Show Active")
-    accept_btn = Button(700, 600, 150, 50, "Accept")
-    complete_btn = Button(700, 600, 150, 50, "Complete")
-    back_btn = Button(850, 600, 150, 50, "Back")
+class QuestScene(Scene):
+    state = GameState.QUEST
+    
+    def __init__(self, player):
+        super().__init__()
+        self.player = player
+        self.selected_quest = None
+        self.show_active = True  # Toggle between active and available quests
+        self.show_completed = False  # Turned-in quests, loaded from the save on first view
+        
+        # Create buttons
+        self.toggle_btn = Button(50, 100, 200, 50, "Show Available" if self.show_active else "Show Active")
+        self.completed_btn = Button(270, 100, 200, 50, "Show Completed")
+        self.accept_btn = Button(700, 600, 150, 50, "Accept")
+        self.complete_btn = Button(700, 600, 150, 50, "Complete")
+        self.back_btn = Button(850, 600, 150, 50, "Back")
+    
+    def quest_list(self):
+        if self.show_completed:
+            return self.player.completed_quests
+        return self.player.active_quests if self.show_active else self.player.quests
+    
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            mouse_pos = event.pos
+            
+            # Check quest selection
+            for i, quest in enumerate(self.quest_list()):
+                quest_rect = pygame.Rect(50, 170 + i * 100, 600, 80)
+                if quest_rect.collidepoint(mouse_pos):
+                    self.selected_quest = quest
+            
+            # Check button clicks
+            if self.back_btn.is_clicked(mouse_pos, event):
+                game.pop()
+                return
+            
+            if self.toggle_btn.is_clicked(mouse_pos, event):
+                if self.show_completed:
+                    self.show_completed = False
+                else:
+                    self.show_active = not self.show_active
+                self.toggle_btn.text = "Show Available" if self.show_active else "Show Active"
+                self.selected_quest = None
+            
+            if self.completed_btn.is_clicked(mouse_pos, event):
+                self.show_completed = True
+                self.selected_quest = None
+                return
+            
+            selected_quest = self.selected_quest
+            if selected_quest and not self.show_completed:
+                if self.show_active and self.complete_btn.is_clicked(mouse_pos, event):
+                    if selected_quest.completed:
+                        self.player.complete_quest(selected_quest)
+                        self.selected_quest = None
+                elif not self.show_active and self.accept_btn.is_clicked(mouse_pos, event):
+                    self.player.start_quest(selected_quest)
+                    self.selected_quest = None
+                    self.show_active = True
+                    self.toggle_btn.text = "Show Available"
     
-    while True:
+    def update(self):
         mouse_pos = pygame.mouse.get_pos()
         
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-                
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                # Check quest selection
-                quest_list = player.active_quests if show_active else player.quests
-                for i, quest in enumerate(quest_list):
-                    quest_rect = pygame.Rect(50, 170 + i * 100, 600, 80)
-                    if quest_rect.collidepoint(mouse_pos):
-                        selected_quest = quest
-                
-                # Check button clicks
-                if back_btn.is_clicked(mouse_pos, event):
-                    return
-                
-                if toggle_btn.is_clicked(mouse_pos, event):
-                    show_active = not show_active
-                    toggle_btn.text = "Show Available" if show_active else "Show Active"
-                    selected_quest = None
-                
-                if selected_quest:
-                    if show_active and complete_btn.is_clicked(mouse_pos, event):
-                        if selected_quest.completed:
-                            player.complete_quest(selected_quest)
-                            selected_quest = None
-                    elif not show_active and accept_btn.is_clicked(mouse_pos, event):
-                        player.start_quest(selected_quest)
-                        selected_quest = None
-                        show_active = True
-                        toggle_btn.text = "Show Available"
-        
         # Update button hover states
-        back_btn.check_hover(mouse_pos)
-        toggle_btn.check_hover(mouse_pos)
+        self.back_btn.check_hover(mouse_pos)
+        self.toggle_btn.check_hover(mouse_pos)
+        self.completed_btn.check_hover(mouse_pos)
         
-        if selected_quest:
-            if show_active:
-                complete_btn.check_hover(mouse_pos)
+        if self.selected_quest and not self.show_completed:
+            if self.show_active:
+                self.complete_btn.check_hover(mouse_pos)
             else:
-                accept_btn.check_hover(mouse_pos)
+                self.accept_btn.check_hover(mouse_pos)
+    
+    def get_widgets(self):
+        widgets = [self.back_btn, self.toggle_btn, self.completed_btn]
+        if self.show_completed:
+            return widgets
+        if self.selected_quest and self.show_active and self.selected_quest.completed:
+            widgets.append(self.complete_btn)
+        elif self.selected_quest and not self.show_active:
+            widgets.append(self.accept_btn)
+        return widgets
+    
+    def draw(self, surface):
+        selected_quest = self.selected_quest
+        show_completed = self.show_completed
+        show_active = self.show_active and not show_completed
         
         # Draw quest screen
-        screen.fill(BLACK)
-        
         # Draw background
-        screen.blit(assets.town_bg, (0, 0))
+        surface.blit(assets.town_bg, (0, 0))
         
         # Draw title
-        title_text = font_large.render("Active Quests" if show_active else "Available Quests", True, WHITE)
-        screen.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, 50))
+        if show_completed:
+            title = "Completed Quests"
+        else:
+            title = "Active Quests" if show_active else "Available Quests"
+        title_text = text_cache.render(font_large, title, True, WHITE)
+        surface.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, 50))
         
-        # Draw toggle button
-        toggle_btn.draw(screen)
+        # Draw toggle buttons
+        self.toggle_btn.draw(surface)
+        self.completed_btn.draw(surface)
         
         # Draw quests
-        quest_list = player.active_quests if show_active else player.quests
-        for i, quest in enumerate(quest_list):
+        for i, quest in enumerate(self.quest_list()):
             # Draw quest box
             color = YELLOW if selected_quest == quest else BLUE
-            pygame.draw.rect(screen, color, (50, 170 + i * 100, 600, 80), border_radius=5)
-            pygame.draw.rect(screen, BLACK, (50, 170 + i * 100, 600, 80), 2, border_radius=5)
+            pygame.draw.rect(surface, color, (50, 170 + i * 100, 600, 80), border_radius=5)
+            pygame.draw.rect(surface, BLACK, (50, 170 + i * 100, 600, 80), 2, border_radius=5)
             
             # Draw quest info
-            title_text = font_medium.render(quest.title, True, BLACK)
-            screen.blit(title_text, (70, 180 + i * 100))
+            title_text = text_cache.render(font_medium, quest.title, True, BLACK)
+            surface.blit(title_text, (70, 180 + i * 100))
             
-            status_text = font_small.render("(Completed)" if quest.completed else "(In Progress)", True, BLACK)
-            screen.blit(status_text, (70, 210 + i * 100))
+            if show_completed:
+                status = "(Turned In)"
+            else:
+                status = "(Completed)" if quest.completed else "(In Progress)"
+            status_text = text_cache.render(font_small, status, True, BLACK)
+            surface.blit(status_text, (70, 210 + i * 100))
             
-            objective_text = font_small.render(f"Objective: {quest.objective}", True, BLACK)
-            screen.blit(objective_text, (70, 230 + i * 100))
+            objective_text = text_cache.render(font_small, f"Objective: {quest.objective}", True, BLACK)
+            surface.blit(objective_text, (70, 230 + i * 100))
         
         # Draw selected quest info
         if selected_quest:
@@ -1674,683 +2877,810 @@ def quest_screen(player):
                 for enemy, quantity in selected_quest.required_kills.items():
                     current = selected_quest.current_kills.get(enemy, 0)
                     info_text.append(f" - {enemy}: {current}/{quantity}")
+            if show_active and selected_quest.required_item:
+                item_name, quantity = selected_quest.required_item
+                info_text.append("Progress:")
+                info_text.append(f" - {item_name}: {min(selected_quest.current_items, quantity)}/{quantity}")
             
             # Draw info
             for i, text in enumerate(info_text):
-                text_surf = font_small.render(text, True, WHITE)
-                screen.blit(text_surf, (700, 150 + i * 25))
+                text_surf = text_cache.render(font_small, text, True, WHITE)
+                surface.blit(text_surf, (700, 150 + i * 25))
             
             # Draw appropriate action button
             if show_active:
                 if selected_quest.completed:
-                    complete_btn.draw(screen)
-            else:
-                accept_btn.draw(screen)
-        
-        back_btn.draw(screen)
+                    self.complete_btn.draw(surface)
+            elif not show_completed:
+                self.accept_btn.draw(surface)
         
-        pygame.display.flip()
-        clock.tick(FPS)
+        self.back_btn.draw(surface)
 
-# Map screen
-def map_screen(player):
-    # Create buttons
-    back_btn = Button(50, 50, 100, 50, "Back")
-    
-    # Location markers
-    locations = [
-        {"name": "Starting Forest", "pos": (200, 400), "unlocked": True},
-        {"name": "Greenfield Town", "pos": (300, 350), "unlocked": True},
-        {"name": "Dark Cave", "pos": (400, 450), "unlocked": "Dark Cave" in player.locations_unlocked},
-        {"name": "Mountain Pass", "pos": (500, 300), "unlocked": "Mountain Pass" in player.locations_unlocked},
-        {"name": "Dragon's Keep", "pos": (600, 200), "unlocked": "Dragon's Keep" in player.locations_unlocked},
-    ]
+# Map screen. Closes with the chosen location name, or None for Back
+class MapScene(Scene):
+    state = GameState.MAP
+    
+    def __init__(self, player):
+        super().__init__()
+        self.player = player
+        
+        # Create buttons
+        self.back_btn = Button(50, 50, 100, 50, "Back")
+        
+        assets.prefetch("map")
+        
+        # Location markers
+        self.locations = [
+            {"name": "Starting Forest", "pos": (200, 400), "unlocked": True},
+            {"name": "Greenfield Town", "pos": (300, 350), "unlocked": True},
+            {"name": "Dark Cave", "pos": (400, 450), "unlocked": "Dark Cave" in player.locations_unlocked},
+            {"name": "Mountain Pass", "pos": (500, 300), "unlocked": "Mountain Pass" in player.locations_unlocked},
+            {"name": "Dragon's Keep", "pos": (600, 200), "unlocked": "Dragon's Keep" in player.locations_unlocked},
+        ]
     
-    while True:
-        mouse_pos = pygame.mouse.get_pos()
-        
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-                
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if back_btn.is_clicked(mouse_pos, event):
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if self.back_btn.is_clicked(event.pos, event):
+                game.pop()
+                return
+            
+            # Check if clicking on a location
+            for loc in self.locations:
+                marker_rect = pygame.Rect(loc["pos"][0] - 10, loc["pos"][1] - 10, 20, 20)
+                if marker_rect.collidepoint(event.pos) and loc["unlocked"]:
+                    self.player.location = loc["name"]
+                    game.pop(loc["name"])
                     return
-                
-                # Check if clicking on a location
-                for loc in locations:
-                    marker_rect = pygame.Rect(loc["pos"][0] - 10, loc["pos"][1] - 10, 20, 20)
-                    if marker_rect.collidepoint(mouse_pos) and loc["unlocked"]:
-                        player.location = loc["name"]
-                        return
+    
+    def get_widgets(self):
+        return [self.back_btn]
+    
+    def draw(self, surface):
+        player = self.player
         
         # Draw map screen
-        screen.fill(BLACK)
-        
         # Draw map background
-        screen.blit(assets.map_bg, (0, 0))
+        surface.blit(assets.map_bg, (0, 0))
         
         # Draw title
-        title_text = font_large.render("World Map", True, WHITE)
-        screen.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, 50))
+        title_text = text_cache.render(font_large, "World Map", True, WHITE)
+        surface.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, 50))
         
         # Draw current location
-        loc_text = font_medium.render(f"Current Location: {player.location}", True, WHITE)
-        screen.blit(loc_text, (SCREEN_WIDTH//2 - loc_text.get_width()//2, 100))
+        loc_text = text_cache.render(font_medium, f"Current Location: {player.location}", True, WHITE)
+        surface.blit(loc_text, (SCREEN_WIDTH//2 - loc_text.get_width()//2, 100))
         
         # Draw location markers
-        for loc in locations:
+        for loc in self.locations:
             if loc["unlocked"]:
                 color = YELLOW if loc["name"] == player.location else GREEN
-                pygame.draw.circle(screen, color, loc["pos"], 10)
+                pygame.draw.circle(surface, color, loc["pos"], 10)
                 
                 # Draw location name
-                name_text = font_small.render(loc["name"], True, WHITE)
-                screen.blit(name_text, (loc["pos"][0] - name_text.get_width()//2, loc["pos"][1] + 15))
+                name_text = text_cache.render(font_small, loc["name"], True, WHITE)
+                surface.blit(name_text, (loc["pos"][0] - name_text.get_width()//2, loc["pos"][1] + 15))
             else:
-                pygame.draw.circle(screen, RED, loc["pos"], 10)
-                pygame.draw.line(screen, BLACK, (loc["pos"][0] - 7, loc["pos"][1] - 7), 
+                pygame.draw.circle(surface, RED, loc["pos"], 10)
+                pygame.draw.line(surface, BLACK, (loc["pos"][0] - 7, loc["pos"][1] - 7),
                                  (loc["pos"][0] + 7, loc["pos"][1] + 7), 2)
-                pygame.draw.line(screen, BLACK, (loc["pos"][0] + 7, loc["pos"][1] - 7), 
+                pygame.draw.line(surface, BLACK, (loc["pos"][0] + 7, loc["pos"][1] - 7),
                                  (loc["pos"][0] - 7, loc["pos"][1] + 7), 2)
         
         # Draw connections between locations
-        pygame.draw.line(screen, WHITE, (200, 400), (300, 350), 2)  # Forest to Town
-        pygame.draw.line(screen, WHITE, (300, 350), (400, 450), 2)  # Town to Cave
-        pygame.draw.line(screen, WHITE, (300, 350), (500, 300), 2)  # Town to Mountain
-        pygame.draw.line(screen, WHITE, (500, 300), (600, 200), 2)  # Mountain to Dragon
+        pygame.draw.line(surface, WHITE, (200, 400), (300, 350), 2)  # Forest to Town
+        pygame.draw.line(surface, WHITE, (300, 350), (400, 450), 2)  # Town to Cave
+        pygame.draw.line(surface, WHITE, (300, 350), (500, 300), 2)  # Town to Mountain
+        pygame.draw.line(surface, WHITE, (500, 300), (600, 200), 2)  # Mountain to Dragon
         
-        back_btn.draw(screen)
-        
-        pygame.display.flip()
-        clock.tick(FPS)
+        self.back_btn.draw(surface)
 
-# Show message popup
+# Show message popup over the current scene
 def show_message(message, duration=2):
-    popup = pygame.Surface((600, 100), pygame.SRCALPHA)
-    popup.fill((0, 0, 0, 200))
-    pygame.draw.rect(popup, WHITE, (0, 0, 600, 100), 2)
-    
-    # Split message into multiple lines if needed
-    words = message.split(' ')
-    lines = []
-    current_line = ""
-    
-    for word in words:
-        test_line = current_line + word + " "
-        if font_medium.size(test_line)[0] < 580:
-            current_line = test_line
-        else:
-            lines.append(current_line)
-            current_line = word + " "
+    game.show_message(message, duration)
+
+# Play a looping music track, skipping tracks that fail to load
+def play_music(path):
+    if not path:
+        return
+    try:
+        mixer.music.load(path)
+        mixer.music.play(-1)  # Loop indefinitely
+    except pygame.error:
+        print(f"Music {path} not found!")
+
+# Main menu with save/load options
+class MainMenuScene(Scene):
+    state = GameState.MAIN_MENU
     
-    if current_line:
-        lines.append(current_line)
+    def __init__(self):
+        super().__init__()
+        
+        # Create buttons
+        self.start_btn = Button(SCREEN_WIDTH//2 - 100, 250, 200, 50, "New Game")
+        self.load_btn = Button(SCREEN_WIDTH//2 - 100, 325, 200, 50, "Load Game")
+        self.quit_btn = Button(SCREEN_WIDTH//2 - 100, 400, 200, 50, "Quit")
+        
+        # Only the menu background is needed now; warm up the town while we wait
+        assets.prefetch("main_menu")
+        assets.prefetch("town", background=True)
+        
+        # Play menu music
+        play_music(assets.menu_music)
+    
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if self.start_btn.is_clicked(event.pos, event):
+                # Stop menu music
+                mixer.music.stop()
+                game.switch(NameEntryScene())
+            elif self.load_btn.is_clicked(event.pos, event):
+                slots = list_save_slots()
+                if slots:
+                    game.switch(SaveSlotScene(slots))
+                else:
+                    show_message("No save game found or error loading!", 2)
+            elif self.quit_btn.is_clicked(event.pos, event):
+                game.quit()
     
-    # Draw message lines
-    for i, line in enumerate(lines):
-        line_text = font_medium.render(line, True, WHITE)
-        popup.blit(line_text, (300 - line_text.get_width()//2, 30 + i * 30))
+    def update(self):
+        mouse_pos = pygame.mouse.get_pos()
+        
+        # Update button hover states
+        self.start_btn.check_hover(mouse_pos)
+        self.load_btn.check_hover(mouse_pos)
+        self.quit_btn.check_hover(mouse_pos)
     
-    start_time = pygame.time.get_ticks()
+    def get_widgets(self):
+        return [self.start_btn, self.load_btn, self.quit_btn]
     
-    while pygame.time.get_ticks() - start_time < duration * 1000:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+    def draw(self, surface):
+        # Draw main menu
+        surface.blit(assets.main_menu_bg, (0, 0))
         
-        screen.blit(popup, (SCREEN_WIDTH//2 - 300, SCREEN_HEIGHT//2 - 50))
-        pygame.display.flip()
-        clock.tick(FPS)
+        # Draw title
+        title_text = text_cache.render(font_title, "EPIC ADVENTURE RPG", True, GOLD)
+        surface.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, 100))
+        
+        # Draw version
+        version_text = text_cache.render(font_small, "Enhanced Edition", True, WHITE)
+        surface.blit(version_text, (SCREEN_WIDTH//2 - version_text.get_width()//2, 170))
+        
+        # Draw buttons
+        self.start_btn.draw(surface)
+        self.load_btn.draw(surface)
+        self.quit_btn.draw(surface)
 
-# Main menu with save/load options
-def main_menu():
-    # Create buttons
-    start_btn = Button(SCREEN_WIDTH//2 - 100, 250, 200, 50, "New Game")
-    load_btn = Button(SCREEN_WIDTH//2 - 100, 325, 200, 50, "Load Game")
-    quit_btn = Button(SCREEN_WIDTH//2 - 100, 400, 200, 50, "Quit")
-    
-    # Play menu music
-    if assets.menu_music:
-        mixer.music.load(assets.menu_music)
-        mixer.music.play(-1)  # Loop indefinitely
+# Lists the saves a page at a time from their slot headers. Only the save
+# picked is read in full, by LoadingScene
+class SaveSlotScene(Scene):
+    state = GameState.SAVE_SLOTS
+    
+    def __init__(self, slots):
+        super().__init__()
+        self.slots = slots
+        self.page = 0
+        self.pages = (len(slots) - 1) // SAVE_SLOTS_PER_PAGE + 1
+        
+        # Create buttons
+        self.slot_btns = [Button(SCREEN_WIDTH//2 - 400, 150 + i * 70, 800, 55, "")
+                          for i in range(SAVE_SLOTS_PER_PAGE)]
+        self.prev_btn = Button(SCREEN_WIDTH//2 - 400, 600, 150, 50, "Prev")
+        self.next_btn = Button(SCREEN_WIDTH//2 - 230, 600, 150, 50, "Next")
+        self.back_btn = Button(SCREEN_WIDTH//2 + 250, 600, 150, 50, "Back")
+        self.show_page(0)
+    
+    def show_page(self, page):
+        self.page = page
+        start = page * SAVE_SLOTS_PER_PAGE
+        self.page_slots = self.slots[start:start + SAVE_SLOTS_PER_PAGE]
+        for btn, (path, header) in zip(self.slot_btns, self.page_slots):
+            btn.text = save_slot_label(path, header)
+        self.view.invalidate()
+    
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            for btn, (path, header) in zip(self.slot_btns, self.page_slots):
+                if btn.is_clicked(event.pos, event):
+                    game.switch(LoadingScene(path))
+                    return
+            
+            if self.prev_btn.is_clicked(event.pos, event) and self.page > 0:
+                self.show_page(self.page - 1)
+            elif self.next_btn.is_clicked(event.pos, event) and self.page < self.pages - 1:
+                self.show_page(self.page + 1)
+            elif self.back_btn.is_clicked(event.pos, event):
+                game.switch(MainMenuScene())
     
-    while True:
+    def update(self):
         mouse_pos = pygame.mouse.get_pos()
         
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-                
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if start_btn.is_clicked(mouse_pos, event):
-                    # Stop menu music
-                    if assets.menu_music:
-                        mixer.music.stop()
-                    return "new"
-                elif load_btn.is_clicked(mouse_pos, event):
-                    loaded_player = Player.load_game()
-                    if loaded_player:
-                        # Stop menu music
-                        if assets.menu_music:
-                            mixer.music.stop()
-                        return loaded_player
-                    else:
-                        show_message("No save game found or error loading!", 2)
-                elif quit_btn.is_clicked(mouse_pos, event):
-                    pygame.quit()
-                    sys.exit()
-        
         # Update button hover states
-        start_btn.check_hover(mouse_pos)
-        load_btn.check_hover(mouse_pos)
-        quit_btn.check_hover(mouse_pos)
+        for btn in self.get_widgets():
+            btn.check_hover(mouse_pos)
+    
+    def get_widgets(self):
+        return self.slot_btns[:len(self.page_slots)] + [self.prev_btn, self.next_btn, self.back_btn]
+    
+    def draw(self, surface):
+        surface.blit(assets.main_menu_bg, (0, 0))
         
-        # Draw main menu
-        screen.fill(BLACK)
-        screen.blit(assets.main_menu_bg, (0, 0))
+        title_text = text_cache.render(font_large, "Load Game", True, GOLD)
+        surface.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, 60))
         
-        # Draw title
-        title_text = font_title.render("EPIC ADVENTURE RPG", True, GOLD)
-        screen.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, 100))
+        page_text = text_cache.render(font_small, f"Page {self.page + 1}/{self.pages}", True, WHITE)
+        surface.blit(page_text, (SCREEN_WIDTH//2 - 40, 615))
         
-        # Draw version
-        version_text = font_small.render("Enhanced Edition", True, WHITE)
-        screen.blit(version_text, (SCREEN_WIDTH//2 - version_text.get_width()//2, 170))
+        for btn in self.get_widgets():
+            btn.draw(surface)
+
+# Reads a save on a worker thread, drawing a progress bar over the menu
+# background until it is parsed, then starts the game
+class LoadingScene(Scene):
+    state = GameState.LOADING
+    
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.animating = True
+        self.progress = 0.0
+        self.drawn_progress = None
+        self.result = None
+        self.thread = threading.Thread(target=self.read, args=(path,), daemon=True)
+        self.thread.start()
+    
+    def read(self, path):
+        try:
+            self.result = Player.read_save(path, self.set_progress)
+        except Exception as e:
+            print(f"Save {path} unreadable ({e})")
+    
+    def set_progress(self, fraction):
+        self.progress = fraction
+    
+    def update(self):
+        if self.thread.is_alive():
+            if self.progress != self.drawn_progress:
+                self.view.invalidate()
+            return
+        
+        player = None
+        if self.result:
+            try:
+                player = Player.from_save(*self.result)
+            except Exception as e:
+                print(f"Save could not be restored ({e})")
+        
+        if player:
+            # Saves from before slots carry on in a slot of their own. The
+            # new slot has no save for a journal to extend, so its first
+            # write has to be a full save
+            if os.path.dirname(self.path) != SAVE_DIR:
+                player.save_path = new_save_slot()
+                player.journal_generation = None
+            else:
+                player.save_path = self.path
+            
+            # Stop menu music
+            mixer.music.stop()
+            start_game(player)
+        else:
+            game.switch(MainMenuScene())
+            show_message("No save game found or error loading!", 2)
+    
+    def draw(self, surface):
+        surface.blit(assets.main_menu_bg, (0, 0))
         
-        # Draw buttons
-        start_btn.draw(screen)
-        load_btn.draw(screen)
-        quit_btn.draw(screen)
+        text = text_cache.render(font_medium, "Loading...", True, WHITE)
+        surface.blit(text, (SCREEN_WIDTH//2 - text.get_width()//2, 300))
         
-        pygame.display.flip()
-        clock.tick(FPS)
+        pygame.draw.rect(surface, GRAY, (SCREEN_WIDTH//2 - 200, 350, 400, 20))
+        pygame.draw.rect(surface, GOLD, (SCREEN_WIDTH//2 - 200, 350, int(400 * self.progress), 20))
+        pygame.draw.rect(surface, WHITE, (SCREEN_WIDTH//2 - 200, 350, 400, 20), 2)
+        self.drawn_progress = self.progress
 
-def town_screen(player, npcs):
-    # Create buttons
-    explore_btn = Button(SCREEN_WIDTH//2 - 100, 300, 200, 50, "Explore")
-    quests_btn = Button(SCREEN_WIDTH//2 - 100, 375, 200, 50, "Quests")
-    skills_btn = Button(SCREEN_WIDTH//2 - 100, 450, 200, 50, "Skills")
-    craft_btn = Button(SCREEN_WIDTH//2 - 100, 525, 200, 50, "Crafting")
-    map_btn = Button(SCREEN_WIDTH//2 - 100, 600, 200, 50, "Map")
+# Player name entry for a new game
+class NameEntryScene(Scene):
+    state = GameState.MAIN_MENU
     
-    # NPC buttons
-    npc_btns = []
-    for i, npc in enumerate(npcs):
-        npc_btns.append(Button(50, 150 + i * 100, 200, 80, npc.name))
+    def __init__(self):
+        super().__init__()
+        self.name = ""
+        self.name_prompt = text_cache.render(font_large, "Enter your name:", True, WHITE)
+        self.name_rect = pygame.Rect(SCREEN_WIDTH//2 - 150, SCREEN_HEIGHT//2, 300, 50)
+    
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_RETURN:
+                if self.name.strip():
+                    start_game(Player(self.name.strip()), new_game=True)
+            elif event.key == pygame.K_BACKSPACE:
+                self.name = self.name[:-1]
+            else:
+                if len(self.name) < 20 and event.unicode.isalnum():
+                    self.name += event.unicode
     
-    while True:
-        mouse_pos = pygame.mouse.get_pos()
+    def draw(self, surface):
+        # Draw name input screen
+        surface.blit(assets.main_menu_bg, (0, 0))
         
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-                
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if explore_btn.is_clicked(mouse_pos, event):
-                    return "explore"
-                elif quests_btn.is_clicked(mouse_pos, event):
-                    quest_screen(player)
-                elif skills_btn.is_clicked(mouse_pos, event):
-                    skills_screen(player)
-                elif craft_btn.is_clicked(mouse_pos, event):
-                    crafting_screen(player, create_crafting_recipes())
-                elif map_btn.is_clicked(mouse_pos, event):
-                    map_screen(player)
-                
-                # Check NPC interactions
-                for i, btn in enumerate(npc_btns):
-                    if btn.is_clicked(mouse_pos, event):
-                        npcs[i].interact(player)
+        surface.blit(self.name_prompt, (SCREEN_WIDTH//2 - self.name_prompt.get_width()//2, SCREEN_HEIGHT//2 - 100))
+        
+        pygame.draw.rect(surface, WHITE, self.name_rect, 2)
+        name_surface = text_cache.render(font_medium, self.name, True, WHITE)
+        surface.blit(name_surface, (self.name_rect.x + 10, self.name_rect.y + 10))
+
+class TownScene(Scene):
+    state = GameState.PLAYING
+    
+    def __init__(self, player, npcs):
+        super().__init__()
+        self.player = player
+        self.npcs = npcs
+        
+        # Create buttons
+        self.explore_btn = Button(SCREEN_WIDTH//2 - 100, 300, 200, 50, "Explore")
+        self.quests_btn = Button(SCREEN_WIDTH//2 - 100, 375, 200, 50, "Quests")
+        self.skills_btn = Button(SCREEN_WIDTH//2 - 100, 450, 200, 50, "Skills")
+        self.craft_btn = Button(SCREEN_WIDTH//2 - 100, 525, 200, 50, "Crafting")
+        self.map_btn = Button(SCREEN_WIDTH//2 - 100, 600, 200, 50, "Map")
+        self.info_panel = InfoPanel(SCREEN_WIDTH - 200, 50, 200)
+        
+        assets.prefetch("town")
+        assets.prefetch("explore", background=True)
+        
+        # NPC buttons
+        self.npc_btns = []
+        for i, npc in enumerate(npcs):
+            self.npc_btns.append(Button(50, 150 + i * 100, 200, 80, npc.name))
+    
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            mouse_pos = event.pos
+            player = self.player
+            
+            if self.explore_btn.is_clicked(mouse_pos, event):
+                player.location = "Starting Forest"
+                game.switch(create_location_scene())
+                return
+            elif self.quests_btn.is_clicked(mouse_pos, event):
+                game.push(QuestScene(player))
+            elif self.skills_btn.is_clicked(mouse_pos, event):
+                game.push(SkillsScene(player))
+            elif self.craft_btn.is_clicked(mouse_pos, event):
+                game.push(CraftingScene(player, create_crafting_recipes()))
+            elif self.map_btn.is_clicked(mouse_pos, event):
+                game.push(MapScene(player), self.after_map)
+            
+            # Check NPC interactions
+            for i, btn in enumerate(self.npc_btns):
+                if btn.is_clicked(mouse_pos, event):
+                    self.npcs[i].interact(player)
+    
+    def after_map(self, location):
+        if location and location != "Greenfield Town":
+            game.switch(create_location_scene())
+    
+    def update(self):
+        mouse_pos = pygame.mouse.get_pos()
+        player = self.player
         
         # Update button hover states
-        explore_btn.check_hover(mouse_pos)
-        quests_btn.check_hover(mouse_pos)
-        skills_btn.check_hover(mouse_pos)
-        craft_btn.check_hover(mouse_pos)
-        map_btn.check_hover(mouse_pos)
-        for btn in npc_btns:
+        self.explore_btn.check_hover(mouse_pos)
+        self.quests_btn.check_hover(mouse_pos)
+        self.skills_btn.check_hover(mouse_pos)
+        self.craft_btn.check_hover(mouse_pos)
+        self.map_btn.check_hover(mouse_pos)
+        for btn in self.npc_btns:
             btn.check_hover(mouse_pos)
         
-        # Draw town screen
-        screen.fill(BLACK)
-        screen.blit(assets.town_bg, (0, 0))
-        
-        # Draw title
-        title_text = font_large.render(f"{player.location}", True, WHITE)
-        screen.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, 50))
-        
-        # Draw player info
-        info_text = [
+        # Update player info
+        self.info_panel.set_lines([
             f"Name: {player.name}",
             f"Level: {player.level}",
             f"HP: {player.hp}/{player.max_hp}",
             f"Gold: {player.gold}",
             f"Day: {player.day_count}"
-        ]
+        ])
+    
+    def get_widgets(self):
+        return [self.explore_btn, self.quests_btn, self.skills_btn, self.craft_btn,
+                self.map_btn, self.info_panel] + self.npc_btns
+    
+    def draw(self, surface):
+        # Draw town screen
+        surface.blit(assets.town_bg, (0, 0))
+        
+        # Draw title
+        title_text = text_cache.render(font_large, f"{self.player.location}", True, WHITE)
+        surface.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, 50))
         
-        for i, text in enumerate(info_text):
-            text_surf = font_small.render(text, True, WHITE)
-            screen.blit(text_surf, (SCREEN_WIDTH - 200, 50 + i * 30))
+        # Draw player info
+        self.info_panel.draw(surface)
         
         # Draw buttons
-        explore_btn.draw(screen)
-        quests_btn.draw(screen)
-        skills_btn.draw(screen)
-        craft_btn.draw(screen)
-        map_btn.draw(screen)
+        self.explore_btn.draw(surface)
+        self.quests_btn.draw(surface)
+        self.skills_btn.draw(surface)
+        self.craft_btn.draw(surface)
+        self.map_btn.draw(surface)
         
         # Draw NPCs
-        for i, btn in enumerate(npc_btns):
-            btn.draw(screen)
-            screen.blit(npcs[i].image, (270, 150 + i * 100))
-        
-        pygame.display.flip()
-        clock.tick(FPS)
+        for i, btn in enumerate(self.npc_btns):
+            btn.draw(surface)
+            surface.blit(self.npcs[i].image, (270, 150 + i * 100))
+
+# Pick a random enemy template and create an enemy scaled to the
+# player's level for one fight
+def random_encounter(enemies, player, rng=None):
+    world = (rng or game_rng).world
+    template = world.choice(enemies)
+    
+    # Scale enemy level to player level
+    return Enemy.scaled(template, max(1, player.level + world.randint(-1, 2)))
 
-def explore_screen(player, enemies, crafting_recipes):
-    # Create buttons
-    town_btn = Button(50, 50, 100, 50, "Town")
-    hunt_btn = Button(SCREEN_WIDTH//2 - 100, 300, 200, 50, "Hunt Enemies")
-    gather_btn = Button(SCREEN_WIDTH//2 - 100, 375, 200, 50, "Gather Materials")
-    fish_btn = Button(SCREEN_WIDTH//2 - 100, 450, 200, 50, "Fishing Mini-game")
-    lockpick_btn = Button(SCREEN_WIDTH//2 - 100, 525, 200, 50, "Lockpicking Mini-game")
+# Apply the outcome of a fight to the player. Returns the (message,
+# duration) popups to show
+def resolve_encounter(player, enemy, combat_result, rng=None):
+    messages = []
+    
+    if combat_result == "victory":
+        # Add exp and gold
+        player.add_exp(enemy.exp_reward)
+        player.gold += enemy.gold_reward
+        
+        # Check for loot
+        loot = enemy.generate_loot(rng)
+        if loot:
+            for item in loot:
+                player.add_item(item)
+            messages.append((f"Found {', '.join(i.name for i in loot)}!", 2))
+        
+        # Update quests
+        for quest in player.quest_tracker.enemy_killed(enemy.name):
+            messages.append((f"Quest progress: {quest.title}", 2))
+    
+    elif combat_result == "flee":
+        messages.append(("You escaped safely!", 1))
+    else:
+        messages.append(("You were defeated!", 2))
+        player.hp = player.max_hp // 2  # Heal to half after defeat
+        player.location = "Greenfield Town"  # Return to town
     
-    # Weather and time effects
-    weather_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-    time_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+    return messages
+
+# Gather a random material into the player's inventory
+def gather_material(player, rng=None):
+    found = item_catalog[(rng or game_rng).loot.choice(GATHERABLE)]
+    player.add_item(found)
+    return found
+
+class ExploreScene(Scene):
+    state = GameState.PLAYING
+    
+    def __init__(self, player, enemies, crafting_recipes):
+        super().__init__()
+        self.player = player
+        self.enemies = enemies
+        self.crafting_recipes = crafting_recipes
+        self.enemy = None
+        self.time_tint = NO_TINT  # Until the first update picks the real one
+        self.drawn_weather = None
+        
+        # Create buttons
+        self.town_btn = Button(50, 50, 100, 50, "Town")
+        self.hunt_btn = Button(SCREEN_WIDTH//2 - 100, 300, 200, 50, "Hunt Enemies")
+        self.gather_btn = Button(SCREEN_WIDTH//2 - 100, 375, 200, 50, "Gather Materials")
+        self.fish_btn = Button(SCREEN_WIDTH//2 - 100, 450, 200, 50, "Fishing Mini-game")
+        self.lockpick_btn = Button(SCREEN_WIDTH//2 - 100, 525, 200, 50, "Lockpicking Mini-game")
+        self.info_panel = InfoPanel(SCREEN_WIDTH - 200, 50, 200)
+        
+        assets.prefetch("explore")
+        assets.prefetch("combat", background=True)
+    
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            mouse_pos = event.pos
+            player = self.player
+            
+            if self.town_btn.is_clicked(mouse_pos, event):
+                player.location = "Greenfield Town"
+                game.switch(create_location_scene())
+            elif self.hunt_btn.is_clicked(mouse_pos, event):
+                self.enemy = random_encounter(self.enemies, player)
+                game.push(CombatScene(player, self.enemy), self.after_combat)
+            
+            elif self.gather_btn.is_clicked(mouse_pos, event):
+                found = gather_material(player)
+                show_message(f"Found {found.name}!", 1)
+            
+            elif self.fish_btn.is_clicked(mouse_pos, event):
+                game.push(FishingScene(player))
+            
+            elif self.lockpick_btn.is_clicked(mouse_pos, event):
+                game.push(LockpickingScene(player))
     
-    while True:
-        mouse_pos = pygame.mouse.get_pos()
+    def after_combat(self, combat_result):
+        for message, duration in resolve_encounter(self.player, self.enemy, combat_result):
+            show_message(message, duration)
         
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-                
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if town_btn.is_clicked(mouse_pos, event):
-                    player.location = "Greenfield Town"
-                    return
-                elif hunt_btn.is_clicked(mouse_pos, event):
-                    # Random enemy encounter
-                    enemy = random.choice(enemies)
-                    
-                    # Scale enemy level to player level
-                    enemy.level = max(1, player.level + random.randint(-1, 2))
-                    enemy.hp = enemy.max_hp = 30 * enemy.level
-                    enemy.attack = 8 * enemy.level
-                    enemy.defense = 2 * enemy.level
-                    enemy.exp_reward = 25 * enemy.level
-                    enemy.gold_reward = 10 * enemy.level
-                    
-                    combat_result = combat_screen(player, enemy)
-                    
-                    if combat_result == "victory":
-                        # Add exp and gold
-                        player.add_exp(enemy.exp_reward)
-                        player.gold += enemy.gold_reward
-                        
-                        # Check for loot
-                        loot = enemy.generate_loot()
-                        if loot:
-                            for item in loot:
-                                player.add_item(item)
-                            show_message(f"Found {', '.join(i.name for i in loot)}!", 2)
-                        
-                        # Update quests
-                        for quest in player.active_quests:
-                            if not quest.completed:
-                                if quest.update_kill(enemy.name):
-                                    show_message(f"Quest progress: {quest.title}", 2)
-                    
-                    elif combat_result == "flee":
-                        show_message("You escaped safely!", 1)
-                    else:
-                        show_message("You were defeated!", 2)
-                        player.hp = player.max_hp // 2  # Heal to half after defeat
-                        player.location = "Greenfield Town"  # Return to town
-                        return
-                
-                elif gather_btn.is_clicked(mouse_pos, event):
-                    # Gather random materials
-                    materials = [
-                        Item("Herbs", "material", 0, 5, assets.herb_icon),
-                        Item("Iron Ore", "material", 0, 10, assets.ore_icon),
-                        Item("Rare Herbs", "material", 0, 15, assets.herb_icon)
-                    ]
-                    
-                    found = random.choice(materials)
-                    player.add_item(found)
-                    show_message(f"Found {found.name}!", 1)
-                
-                elif fish_btn.is_clicked(mouse_pos, event):
-                    fishing_minigame(player)
-                
-                elif lockpick_btn.is_clicked(mouse_pos, event):
-                    lockpicking_minigame(player)
+        # Defeat sends the player back to town
+        if self.player.location == "Greenfield Town":
+            game.switch(create_location_scene())
+    
+    def update(self):
+        mouse_pos = pygame.mouse.get_pos()
+        player = self.player
         
         # Update button hover states
-        town_btn.check_hover(mouse_pos)
-        hunt_btn.check_hover(mouse_pos)
-        gather_btn.check_hover(mouse_pos)
-        fish_btn.check_hover(mouse_pos)
-        lockpick_btn.check_hover(mouse_pos)
+        self.town_btn.check_hover(mouse_pos)
+        self.hunt_btn.check_hover(mouse_pos)
+        self.gather_btn.check_hover(mouse_pos)
+        self.fish_btn.check_hover(mouse_pos)
+        self.lockpick_btn.check_hover(mouse_pos)
+        
+        # Update player info
+        self.info_panel.set_lines([
+            f"Name: {player.name}",
+            f"Level: {player.level}",
+            f"HP: {player.hp}/{player.max_hp}",
+            f"Gold: {player.gold}",
+            f"Weather: {player.weather.name.lower().capitalize()}",
+            f"Time: {player.time_of_day.name.lower().capitalize()}"
+        ])
         
-        # Draw explore screen
-        screen.fill(BLACK)
+        # Start, switch or stop the ambient loop and particles for this weather
+        audio.set_ambient(player.weather)
+        weather_system.set_weather(player.weather)
+        weather_system.update()
         
+        # Particles move every frame; otherwise only a tint or weather
+        # change repaints, so clearing weather wipes the last particles
+        self.animating = player.weather != Weather.CLEAR
+        time_tint = get_time_tint(player.time_of_day, player.time_blend)
+        if self.animating or time_tint != self.time_tint or player.weather != self.drawn_weather:
+            self.time_tint = time_tint
+            self.view.invalidate()
+    
+    def get_widgets(self):
+        return [self.town_btn, self.hunt_btn, self.gather_btn, self.fish_btn,
+                self.lockpick_btn, self.info_panel]
+    
+    def draw(self, surface):
+        player = self.player
+        
+        # Draw explore screen
         # Draw appropriate background based on location
         if "Forest" in player.location:
-            screen.blit(assets.forest_bg, (0, 0))
+            surface.blit(assets.forest_bg, (0, 0))
         elif "Cave" in player.location:
-            screen.blit(assets.cave_bg, (0, 0))
+            surface.blit(assets.cave_bg, (0, 0))
         elif "Mountain" in player.location:
-            screen.blit(assets.mountain_bg, (0, 0))
+            surface.blit(assets.mountain_bg, (0, 0))
         else:
-            screen.blit(assets.explore_screen, (0, 0))
+            surface.blit(assets.explore_screen, (0, 0))
         
-        # Draw weather and time effects
-        draw_weather_effect(player.weather)
-        draw_time_effect(player.time_of_day)
+        # Draw weather and time effects as a single overlay
+        weather_system.draw(surface, self.time_tint)
+        if self.view.full:
+            self.drawn_weather = player.weather
         
         # Draw title
-        title_text = font_large.render(f"{player.location}", True, WHITE)
-        screen.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, 50))
+        title_text = text_cache.render(font_large, f"{player.location}", True, WHITE)
+        surface.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, 50))
         
         # Draw player info
-        info_text = [
-            f"Name: {player.name}",
-            f"Level: {player.level}",
-            f"HP: {player.hp}/{player.max_hp}",
-            f"Gold: {player.gold}",
-            f"Weather: {player.weather.name.lower().capitalize()}",
-            f"Time: {player.time_of_day.name.lower().capitalize()}"
-        ]
-        
-        for i, text in enumerate(info_text):
-            text_surf = font_small.render(text, True, WHITE)
-            screen.blit(text_surf, (SCREEN_WIDTH - 200, 50 + i * 30))
+        self.info_panel.draw(surface)
         
         # Draw buttons
-        town_btn.draw(screen)
-        hunt_btn.draw(screen)
-        gather_btn.draw(screen)
-        fish_btn.draw(screen)
-        lockpick_btn.draw(screen)
-        
-        pygame.display.flip()
-        clock.tick(FPS)
+        self.town_btn.draw(surface)
+        self.hunt_btn.draw(surface)
+        self.gather_btn.draw(surface)
+        self.fish_btn.draw(surface)
+        self.lockpick_btn.draw(surface)
 
-def combat_screen(player, enemy):
-    # Combat states
-    PLAYER_TURN = 0
-    ENEMY_TURN = 1
-    VICTORY = 2
-    DEFEAT = 3
-    FLEE = 4
-    
-    combat_state = PLAYER_TURN
-    
-    # Create buttons
-    attack_btn = Button(100, 600, 150, 50, "Attack")
-    defend_btn = Button(300, 600, 150, 50, "Defend")
-    item_btn = Button(500, 600, 150, 50, "Items")
-    flee_btn = Button(700, 600, 150, 50, "Flee")
-    
-    # Combat log
-    log = []
-    
-    while True:
-        mouse_pos = pygame.mouse.get_pos()
-        
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-                
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if combat_state == PLAYER_TURN:
-                    if attack_btn.is_clicked(mouse_pos, event):
-                        # Player attack
-                        damage = max(1, player.attack - enemy.defense // 2)
-                        enemy.take_damage(damage, player.weather)
-                        log.append(f"You hit {enemy.name} for {damage} damage!")
-                        
-                        if not enemy.is_alive():
-                            combat_state = VICTORY
-                            log.append(f"You defeated {enemy.name}!")
-                        else:
-                            combat_state = ENEMY_TURN
-                    
-                    elif defend_btn.is_clicked(mouse_pos, event):
-                        # Player defend (reduces next damage)
-                        log.append("You brace for the enemy's attack!")
-                        # TODO: Implement defend mechanic
-                        combat_state = ENEMY_TURN
-                    
-                    elif item_btn.is_clicked(mouse_pos, event):
-                        # Use item
-                        potions = [i for i in player.inventory if i.type == "potion"]
-                        if potions:
-                            potion = potions[0]  # Use first potion
-                            player.use_item(potion)
-                            log.append(f"You used {potion.name} and healed {potion.stat} HP!")
-                        else:
-                            log.append("You have no potions!")
-                        combat_state = ENEMY_TURN
-                    
-                    elif flee_btn.is_clicked(mouse_pos, event):
-                        # Attempt to flee
-                        if random.random() < 0.7:  # 70% chance to flee
-                            combat_state = FLEE
-                        else:
-                            log.append("You failed to escape!")
-                            combat_state = ENEMY_TURN
-        
-        # Enemy turn
-        if combat_state == ENEMY_TURN:
-            if enemy.is_alive():
-                damage = max(1, enemy.get_attack_power(player.weather) - player.defense // 2)
-                player.take_damage(damage)
-                log.append(f"{enemy.name} hits you for {damage} damage!")
-                
-                if not player.is_alive():
-                    combat_state = DEFEAT
-                    log.append("You were defeated!")
-                else:
-                    combat_state = PLAYER_TURN
-            else:
-                combat_state = VICTORY
+# Combat screen, a renderer over combat.CombatEngine. Closes with
+# "victory", "defeat" or "flee" one second after the fight is decided
+class CombatScene(Scene):
+    state = GameState.COMBAT
+    
+    def __init__(self, player, enemy):
+        super().__init__()
+        self.player = player
+        self.enemy = enemy
+        self.end_time = None
+        
+        # Potions are used first to last; the engine only sees heal amounts
+        self.potions = player.inventory.of_type("potion")
+        self.engine = combat.CombatEngine(player, enemy, player.weather.value,
+                                          potions=[potion.stat for potion in self.potions],
+                                          rng=game_rng.combat)
+        
+        # Create buttons
+        self.attack_btn = Button(100, 600, 150, 50, "Attack")
+        self.defend_btn = Button(300, 600, 150, 50, "Defend")
+        self.item_btn = Button(500, 600, 150, 50, "Items")
+        self.flee_btn = Button(700, 600, 150, 50, "Flee")
+        self.actions = [
+            (self.attack_btn, combat.ATTACK),
+            (self.defend_btn, combat.DEFEND),
+            (self.item_btn, combat.ITEM),
+            (self.flee_btn, combat.FLEE)
+        ]
         
+        # Combat log
+        self.log = []
+        self.logged = 0  # Engine log entries already turned into text
+    
+    def handle_event(self, event):
+        if event.type != pygame.MOUSEBUTTONDOWN or self.engine.state != combat.PLAYER_TURN:
+            return
+        
+        for btn, action in self.actions:
+            if btn.is_clicked(event.pos, event):
+                self.engine.act(action)
+                self.read_log()
+                return
+    
+    def read_log(self):
+        # Turn new engine log entries into messages and apply side effects
+        enemy = self.enemy
+        
+        for turn, event, value in self.engine.log[self.logged:]:
+            if event == combat.HIT:
+                self.log.append(f"You hit {enemy.name} for {value} damage!")
+            elif event == combat.BRACE:
+                self.log.append("You brace for the enemy's attack!")
+            elif event == combat.HEAL:
+                potion = self.potions.pop(0)
+                self.player.inventory.take(potion.name)
+                if assets.heal_sound:
+                    assets.heal_sound.play()
+                self.log.append(f"You used {potion.name} and healed {potion.stat} HP!")
+            elif event == combat.NO_POTIONS:
+                self.log.append("You have no potions!")
+            elif event == combat.FLEE_FAILED:
+                self.log.append("You failed to escape!")
+            elif event == combat.ENEMY_HIT:
+                self.log.append(f"{enemy.name} hits you for {value} damage!")
+            elif event == combat.ENEMY_DEFEATED:
+                self.log.append(f"You defeated {enemy.name}!")
+            elif event == combat.PLAYER_DEFEATED:
+                self.log.append("You were defeated!")
+        
+        self.logged = len(self.engine.log)
+    
+    def update(self):
         # Update button hover states
-        if combat_state == PLAYER_TURN:
-            attack_btn.check_hover(mouse_pos)
-            defend_btn.check_hover(mouse_pos)
-            item_btn.check_hover(mouse_pos)
-            flee_btn.check_hover(mouse_pos)
+        if self.engine.state == combat.PLAYER_TURN:
+            mouse_pos = pygame.mouse.get_pos()
+            for btn, action in self.actions:
+                btn.check_hover(mouse_pos)
+        
+        # Check combat resolution, leaving the outcome on screen for a second
+        result = self.engine.result
+        if result:
+            now = pygame.time.get_ticks()
+            if self.end_time is None:
+                self.end_time = now + 1000
+                self.animating = True
+            elif now >= self.end_time:
+                game.pop(result)
+    
+    def get_widgets(self):
+        if self.engine.state == combat.PLAYER_TURN:
+            return [btn for btn, action in self.actions]
+        return []
+    
+    def draw(self, surface):
+        player = self.player
+        enemy = self.enemy
         
         # Draw combat screen
-        screen.fill(BLACK)
-        
         # Draw background based on weather
         if player.weather == Weather.RAIN:
-            screen.fill((50, 50, 100))
+            surface.fill((50, 50, 100))
         elif player.weather == Weather.SNOW:
-            screen.fill((200, 200, 255))
+            surface.fill((200, 200, 255))
         elif player.weather == Weather.SANDSTORM:
-            screen.fill((210, 180, 140))
+            surface.fill((210, 180, 140))
         else:
-            screen.fill((100, 150, 100))
+            surface.fill((100, 150, 100))
         
         # Draw combatants
-        screen.blit(player.image, (200, 200))
-        screen.blit(enemy.image, (600, 200))
+        surface.blit(player.image, (200, 200))
+        surface.blit(enemy.image, (600, 200))
         
         # Draw health bars
         # Player health
-        pygame.draw.rect(screen, RED, (200, 180, 100, 10))
-        pygame.draw.rect(screen, GREEN, (200, 180, 100 * (player.hp / player.max_hp), 10))
+        pygame.draw.rect(surface, RED, (200, 180, 100, 10))
+        pygame.draw.rect(surface, GREEN, (200, 180, 100 * (player.hp / player.max_hp), 10))
         
         # Enemy health
-        pygame.draw.rect(screen, RED, (600, 180, 100, 10))
-        pygame.draw.rect(screen, GREEN, (600, 180, 100 * (enemy.hp / enemy.max_hp), 10))
+        pygame.draw.rect(surface, RED, (600, 180, 100, 10))
+        pygame.draw.rect(surface, GREEN, (600, 180, 100 * (enemy.hp / enemy.max_hp), 10))
         
         # Draw names and levels
-        player_text = font_small.render(f"{player.name} Lv.{player.level}", True, WHITE)
-        enemy_text = font_small.render(f"{enemy.name} Lv.{enemy.level}", True, WHITE)
-        screen.blit(player_text, (200, 150))
-        screen.blit(enemy_text, (600, 150))
+        player_text = text_cache.render(font_small, f"{player.name} Lv.{player.level}", True, WHITE)
+        enemy_text = text_cache.render(font_small, f"{enemy.name} Lv.{enemy.level}", True, WHITE)
+        surface.blit(player_text, (200, 150))
+        surface.blit(enemy_text, (600, 150))
         
         # Draw combat log
         log_surface = pygame.Surface((600, 150), pygame.SRCALPHA)
         log_surface.fill((0, 0, 0, 150))
         
-        for i, message in enumerate(log[-5:]):  # Show last 5 messages
-            text = font_small.render(message, True, WHITE)
+        for i, message in enumerate(self.log[-5:]):  # Show last 5 messages
+            text = text_cache.render(font_small, message, True, WHITE)
             log_surface.blit(text, (10, 10 + i * 30))
         
-        screen.blit(log_surface, (SCREEN_WIDTH//2 - 300, 400))
+        surface.blit(log_surface, (SCREEN_WIDTH//2 - 300, 400))
         
         # Draw buttons if player's turn
-        if combat_state == PLAYER_TURN:
-            attack_btn.draw(screen)
-            defend_btn.draw(screen)
-            item_btn.draw(screen)
-            flee_btn.draw(screen)
-        
-        # Check combat resolution
-        if combat_state == VICTORY:
-            pygame.display.flip()
-            pygame.time.delay(1000)
-            return "victory"
-        elif combat_state == DEFEAT:
-            pygame.display.flip()
-            pygame.time.delay(1000)
-            return "defeat"
-        elif combat_state == FLEE:
-            pygame.display.flip()
-            pygame.time.delay(1000)
-            return "flee"
-        
-        pygame.display.flip()
-        clock.tick(FPS)
+        if self.engine.state == combat.PLAYER_TURN:
+            self.attack_btn.draw(surface)
+            self.defend_btn.draw(surface)
+            self.item_btn.draw(surface)
+            self.flee_btn.draw(surface)
 
-# Main game function
-def main():
-    # Show main menu
-    menu_result = main_menu()
-    
-    if menu_result == "new":
-        # Initialize new game
-        enemies = create_enemies()
-        quests = create_quests()
-        crafting_recipes = create_crafting_recipes()
-        
-        # Create NPCs
-        npcs = [
-            NPC("Blacksmith", assets.blacksmith_img, 
-                "I can craft weapons and armor for you.", 
-                shop_items=[i for i in create_items() if i.type in ["weapon", "armor"]], 
-                is_merchant=True),
-            NPC("Herbalist", assets.merchant_img, 
-                "I have potions and herbs for sale.", 
-                shop_items=[i for i in create_items() if i.type in ["potion", "material"]], 
-                is_merchant=True),
-            NPC("Quest Giver", assets.quest_giver_img, 
-                "I have tasks for brave adventurers like you.", 
-                quests=quests, 
-                is_quest_giver=True)
-        ]
-        
-        # Get player name
-        name = ""
-        input_active = True
-        name_prompt = font_large.render("Enter your name:", True, WHITE)
-        name_rect = pygame.Rect(SCREEN_WIDTH//2 - 150, SCREEN_HEIGHT//2, 300, 50)
-        
-        while input_active:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                    
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_RETURN:
-                        if name.strip():
-                            input_active = False
-                    elif event.key == pygame.K_BACKSPACE:
-                        name = name[:-1]
-                    else:
-                        if len(name) < 20 and event.unicode.isalnum():
-                            name += event.unicode
-            
-            # Draw name input screen
-            screen.fill(BLACK)
-            screen.blit(assets.main_menu_bg, (0, 0))
-            
-            screen.blit(name_prompt, (SCREEN_WIDTH//2 - name_prompt.get_width()//2, SCREEN_HEIGHT//2 - 100))
-            
-            pygame.draw.rect(screen, WHITE, name_rect, 2)
-            name_surface = font_medium.render(name, True, WHITE)
-            screen.blit(name_surface, (name_rect.x + 10, name_rect.y + 10))
-            
-            pygame.display.flip()
-            clock.tick(FPS)
-        
-        # Create player
-        player = Player(name.strip())
-        
+# Scene for the player's current location
+def create_location_scene():
+    # Arriving somewhere saves the game
+    game.player.save_journal(background=True)
+    
+    if game.player.location == "Greenfield Town":
+        return TownScene(game.player, game.npcs)
+    return ExploreScene(game.player, game.enemies, game.crafting_recipes)
+
+# Set up the world for a new or loaded player and enter it
+def start_game(player, new_game=False):
+    enemies = create_enemies()
+    quests = create_quests()
+    crafting_recipes = create_crafting_recipes()
+    
+    # Create NPCs
+    npcs = [
+        NPC("Blacksmith", assets.blacksmith_img,
+            "I can craft weapons and armor for you.",
+            shop_items=[item_catalog[item_id] for item_id in BLACKSMITH_STOCK],
+            is_merchant=True),
+        NPC("Herbalist", assets.merchant_img,
+            "I have potions and herbs for sale.",
+            shop_items=[item_catalog[item_id] for item_id in HERBALIST_STOCK],
+            is_merchant=True),
+        NPC("Quest Giver", assets.quest_giver_img,
+            "I have tasks for brave adventurers like you.",
+            quests=quests,
+            is_quest_giver=True)
+    ]
+    
+    if new_game:
         # Add starting quest
         player.add_quest(quests[0])
-    else:
-        # Loaded game
-        player = menu_result
-        enemies = create_enemies()
-        quests = create_quests()
-        crafting_recipes = create_crafting_recipes()
-        npcs = [
-            NPC("Blacksmith", assets.blacksmith_img, 
-                "I can craft weapons and armor for you.", 
-                shop_items=[i for i in create_items() if i.type in ["weapon", "armor"]], 
-                is_merchant=True),
-            NPC("Herbalist", assets.merchant_img, 
-                "I have potions and herbs for sale.", 
-                shop_items=[i for i in create_items() if i.type in ["potion", "material"]], 
-                is_merchant=True),
-            NPC("Quest Giver", assets.quest_giver_img, 
-                "I have tasks for brave adventurers like you.", 
-                quests=quests, 
-                is_quest_giver=True)
-        ]
+        player.save_path = new_save_slot()
+    
+    game.player = player
+    game.npcs = npcs
+    game.enemies = enemies
+    game.crafting_recipes = crafting_recipes
     
     # Play explore music
-    if assets.explore_music:
-        mixer.music.load(assets.explore_music)
-        mixer.music.play(-1)
+    play_music(assets.explore_music)
     
-    # Main game loop
-    running = True
-    while running:
-        player.update()
-        
-        # Handle events
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-        
-        # Game logic based on location
-        if player.location == "Greenfield Town":
-            town_screen(player, npcs)
-        else:
-            explore_screen(player, enemies, crafting_recipes)
+    game.switch(create_location_scene())
+
+# Main game function
+def main():
+    game.push(MainMenuScene())
+    game.run()
     
     pygame.quit()
     sys.exit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if "--build-asset-pack" in sys.argv:
+        build_asset_pack()
+    else:
+        # --seed N replays the same gameplay rolls
+        if "--seed" in sys.argv:
+            game_rng.reseed(int(sys.argv[sys.argv.index("--seed") + 1]))
+        main()
\ No newline at end of file
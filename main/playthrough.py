@@ -0,0 +1,218 @@
+# Automated playthroughs for checking progression and the economy. Each
+# run plays the game through its own rules (explore encounters, gathering,
+# crafting, quests, skills) with a scripted policy on a simulated clock,
+# and runs are spread over worker processes with one seed per run.
+#
+#   python playthrough.py [runs] [--hours H] [--workers N] [--seed S]
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# The game module opens a window and an audio device on import
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import combat
+import playing
+from rng import RandomStreams
+
+# Simulated seconds spent on each action
+HUNT_SECONDS = 15
+TURN_SECONDS = 5
+GATHER_SECONDS = 20
+CRAFT_SECONDS = 10
+RETURN_TO_TOWN_SECONDS = 60
+
+GOLD_SAMPLE_SECONDS = 1800  # Gold curve resolution
+POTION_THRESHOLD = 0.3      # Drink below this fraction of max HP
+REST_THRESHOLD = 0.5        # Gather for potions instead of hunting below this
+POTION_STOCK = 3            # Potions to keep crafted
+
+# Skill upgrade priority for spare skill points
+SKILL_PRIORITY = ["Sword Mastery", "Heavy Armor", "Blacksmithing", "Alchemy", "Survival", "Dual Wielding"]
+
+# One scripted playthrough, drawing every roll from its own seeded streams
+class Playthrough:
+    def __init__(self, seed, max_seconds):
+        self.rng = RandomStreams(seed)
+        self.max_seconds = max_seconds
+        self.clock = 0
+        
+        self.player = playing.Player("Sim")
+        self.enemies = playing.create_enemies()
+        self.recipes = playing.create_crafting_recipes()
+        
+        # Accept every quest up front
+        for quest in playing.create_quests():
+            self.player.add_quest(quest)
+            self.player.start_quest(quest)
+        
+        self.level_times = {1: 0}
+        self.dragon_slayer_time = None
+        self.gold_curve = [self.player.gold]
+        self.fights = 0
+    
+    def advance(self, seconds):
+        # Move the clock, rolling weather every 10 seconds as Player.update does
+        start = self.clock
+        self.clock += seconds
+        for _ in range(start // 10, self.clock // 10):
+            if self.rng.weather.random() < 0.1:
+                self.player.roll_weather(self.rng)
+        
+        while len(self.gold_curve) * GOLD_SAMPLE_SECONDS <= min(self.clock, self.max_seconds):
+            self.gold_curve.append(self.player.gold)
+    
+    def run(self):
+        player = self.player
+        while self.clock < self.max_seconds:
+            if player.hp < REST_THRESHOLD * player.max_hp and not player.inventory.count_type("potion"):
+                self.gather()
+            else:
+                self.hunt()
+            
+            self.craft()
+            self.equip_best()
+            self.upgrade_skills()
+            self.turn_in_quests()
+            
+            for level in range(max(self.level_times) + 1, player.level + 1):
+                self.level_times[level] = self.clock
+        
+        return {
+            "level_times": self.level_times,
+            "dragon_slayer_time": self.dragon_slayer_time,
+            "gold_curve": self.gold_curve[:self.max_seconds // GOLD_SAMPLE_SECONDS + 1],
+            "fights": self.fights,
+        }
+    
+    def hunt(self):
+        player = self.player
+        enemy = playing.random_encounter(self.enemies, player, self.rng)
+        
+        # Fight as the combat screen would, drinking potions when low
+        potions = player.inventory.of_type("potion")
+        engine = combat.CombatEngine(player, enemy, player.weather.value,
+                                     potions=[potion.stat for potion in potions], rng=self.rng.combat)
+        
+        def policy():
+            while True:
+                if player.hp < POTION_THRESHOLD * player.max_hp and engine.potions:
+                    yield combat.ITEM
+                else:
+                    yield combat.ATTACK
+        
+        result = engine.run(policy())
+        for turn, event, value in engine.log:
+            if event == combat.HEAL:
+                player.inventory.take(potions.pop(0).name)
+        
+        playing.resolve_encounter(player, enemy, result, self.rng)
+        self.fights += 1
+        self.advance(HUNT_SECONDS + TURN_SECONDS * engine.turn)
+        
+        # Defeat sends the player back to town; walk back out
+        if player.location == "Greenfield Town":
+            player.location = "Starting Forest"
+            self.advance(RETURN_TO_TOWN_SECONDS)
+    
+    def gather(self):
+        playing.gather_material(self.player, self.rng)
+        self.advance(GATHER_SECONDS)
+    
+    def craft(self):
+        player = self.player
+        for recipe in self.recipes:
+            item = recipe.result_item
+            if item.type == "potion":
+                wanted = player.inventory.count_type("potion") < POTION_STOCK
+            else:
+                wanted = not player.inventory.has(item.name)
+            if wanted and recipe.can_craft(player.inventory, player.skills):
+                recipe.craft(player)
+                self.advance(CRAFT_SECONDS)
+    
+    def equip_best(self):
+        player = self.player
+        for slot, equipped in (("weapon", player.equipped_weapon), ("armor", player.equipped_armor)):
+            best = max((item for item, count in player.inventory.stacks() if item.type == slot),
+                       key=lambda item: item.stat, default=None)
+            if best and (not equipped or best.stat > equipped.stat):
+                player.equip_item(best)
+    
+    def upgrade_skills(self):
+        player = self.player
+        while player.level - sum(skill.current_level for skill in player.skills) > 0:
+            if not any(player.upgrade_skill(name) for name in SKILL_PRIORITY):
+                break
+    
+    def turn_in_quests(self):
+        player = self.player
+        for quest in list(player.active_quests):
+            if quest.completed and player.complete_quest(quest):
+                if quest.title == "Dragon Slayer":
+                    self.dragon_slayer_time = self.clock
+
+def run_playthrough(seed, max_seconds):
+    return Playthrough(seed, max_seconds).run()
+
+# Run `runs` playthroughs across worker processes. Seeds are base_seed,
+# base_seed + 1, ... so any single run can be replayed on its own
+def run_playthroughs(runs, max_seconds, workers=None, base_seed=0):
+    seeds = range(base_seed, base_seed + runs)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run_playthrough, seeds, [max_seconds] * runs,
+                             chunksize=max(1, runs // (4 * (workers or os.cpu_count() or 1)))))
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def report(results, max_seconds):
+    runs = len(results)
+    
+    print("Time to level (hours)")
+    print("level  reached   median      p10      p90")
+    max_level = max(max(result["level_times"]) for result in results)
+    for level in range(2, max_level + 1):
+        times = [result["level_times"][level] / 3600 for result in results if level in result["level_times"]]
+        print(f"{level:>5}  {len(times) / runs:>7.0%}  {statistics.median(times):>7.2f}  "
+              f"{percentile(times, 0.1):>7.2f}  {percentile(times, 0.9):>7.2f}")
+    
+    slain = [result["dragon_slayer_time"] / 3600 for result in results if result["dragon_slayer_time"] is not None]
+    if slain:
+        print(f"Dragon Slayer: {len(slain) / runs:.0%} of runs, median {statistics.median(slain):.2f}h, "
+              f"p10 {percentile(slain, 0.1):.2f}h, p90 {percentile(slain, 0.9):.2f}h")
+    else:
+        print("Dragon Slayer: not completed in any run")
+    
+    print("Gold curve")
+    print(" hour     mean      p10      p90")
+    for i in range(0, max_seconds // GOLD_SAMPLE_SECONDS + 1, 2):
+        gold = [result["gold_curve"][i] for result in results]
+        print(f"{i * GOLD_SAMPLE_SECONDS / 3600:>5.1f}  {statistics.mean(gold):>7.0f}  "
+              f"{percentile(gold, 0.1):>7}  {percentile(gold, 0.9):>7}")
+
+def main():
+    args = sys.argv[1:]
+    runs = int(args[0]) if args and args[0].isdigit() else 200
+    
+    def option(name, default):
+        return type(default)(args[args.index(name) + 1]) if name in args else default
+    
+    hours = option("--hours", 10.0)
+    workers = option("--workers", 0) or None
+    seed = option("--seed", 0)
+    max_seconds = int(hours * 3600)
+    
+    start = time.perf_counter()
+    results = run_playthroughs(runs, max_seconds, workers, seed)
+    elapsed = time.perf_counter() - start
+    fights = sum(result["fights"] for result in results)
+    print(f"{runs} playthroughs of {hours:g}h ({fights} fights) in {elapsed:.1f}s")
+    report(results, max_seconds)
+
+if __name__ == "__main__":
+    main()